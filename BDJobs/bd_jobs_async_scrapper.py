@@ -0,0 +1,283 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+import httpx
+from lxml import html as lxml_html
+
+from BDJobs import bd_jobs_job_scrapper
+from BDJobs.bd_jobs_job_scrapper import (
+    RESPONSIBILITIES_XPATH, EDUCATION_XPATH, EXPERIENCE_XPATH, ADDITIONAL_REQUIREMENTS_XPATH,
+    BENEFITS_XPATH, VACANCY_XPATH, COMPANY_XPATH, SKILLS_XPATH, EMPLOYMENT_STATUS_XPATH, INFO_XPATH,
+)
+from rate_limiter import get_limiter, THROTTLE_STATUSES
+from metrics import METRICS
+import page_archive
+
+# --- CONFIGURATION ---
+MAX_CONCURRENCY = 4          # Detail pages in flight at once (pace per host: rate_limiter.HOST_POLICIES)
+REQUEST_TIMEOUT = 30
+BATCH_SIZE = 20              # JavaScript-only pages handed to Selenium at once when streaming
+RETRY_ROUNDS = 1             # Extra tries for pages that failed with 429/5xx or a transport error
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def _clean_text(element):
+    """Collapses the text of an lxml element the way Selenium's `.text` does."""
+    return " ".join(element.text_content().split())
+
+def _text_parts(element):
+    """Returns the non-empty text fragments of an element (Selenium's `.text.split('\\n')`)."""
+    return [part.strip() for part in element.itertext() if part.strip()]
+
+def extract_list_items(tree, parent_xpath):
+    """lxml counterpart of bd_jobs_job_scrapper.extract_list_items."""
+    items = [_clean_text(li) for li in tree.xpath(f"{parent_xpath}//li")]
+    return [item for item in items if item]
+
+def _first_text(tree, xpath, default):
+    found = tree.xpath(xpath)
+    return _clean_text(found[0]) if found else default
+
+def parse_detail_html(page_html, job, url):
+    """
+    Parses a BDJobs detail page fetched over plain HTTP.
+    Returns None when the job summary (#sum) is missing, i.e. the page
+    only renders with JavaScript and has to go through Selenium.
+    """
+    tree = lxml_html.fromstring(page_html)
+    if not tree.xpath("//*[@id='sum']"):
+        return None
+
+    skills_container = tree.xpath(SKILLS_XPATH)
+    skills = _text_parts(skills_container[0]) if skills_container else []
+
+    employment_status = "Not found"
+    status_node = tree.xpath(EMPLOYMENT_STATUS_XPATH)
+    if status_node:
+        parts = _text_parts(status_node[0])
+        if len(parts) > 1:
+            employment_status = parts[1]
+
+    published, age, salary, location = bd_jobs_job_scrapper.parse_info_texts(
+        [_clean_text(element) for element in tree.xpath(INFO_XPATH)]
+    )
+
+    return bd_jobs_job_scrapper.build_job_data(job, url, {
+        'company_name': _first_text(tree, COMPANY_XPATH, "Not found"),
+        'responsibilities': extract_list_items(tree, RESPONSIBILITIES_XPATH),
+        'employment_status': employment_status,
+        'education': extract_list_items(tree, EDUCATION_XPATH),
+        'experience': extract_list_items(tree, EXPERIENCE_XPATH),
+        'additional_requirements': extract_list_items(tree, ADDITIONAL_REQUIREMENTS_XPATH),
+        'vacancy': _first_text(tree, VACANCY_XPATH, "Not specified"),
+        'location': location,
+        'age': age,
+        'salary': salary,
+        'other_benefits': extract_list_items(tree, BENEFITS_XPATH),
+        'published': published,
+        'skills': skills,
+    })
+
+async def fetch_page(client, semaphore, url):
+    """
+    Downloads one page, respecting both the concurrency pool and the
+    adaptive per-host rate limit (which it reports the outcome to).
+    In replay mode the page comes from the page archive instead.
+    """
+    if page_archive.replaying():
+        return page_archive.replay(url).decode('utf-8', errors='replace')
+
+    limiter = get_limiter(urlparse(url).netloc)
+    async with semaphore:
+        delay = limiter.reserve()
+        METRICS.observe("rate_limit_wait_seconds", delay, source="bdjobs")
+        await asyncio.sleep(delay)
+
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except httpx.TransportError:
+            limiter.feedback(error=True)
+            raise
+        latency = time.perf_counter() - start
+        limiter.feedback(status=response.status_code, latency=latency)
+        METRICS.observe("fetch_seconds", latency, source="bdjobs", fetcher="http")
+        METRICS.inc("pages_fetched", source="bdjobs", fetcher="http")
+        METRICS.inc("bytes_fetched", len(response.content), source="bdjobs")
+        response.raise_for_status()
+        page_archive.record(url, response.content, status=response.status_code)
+        return response.text
+
+async def _scrape_one(client, semaphore, job):
+    """
+    Fetches and parses one detail page. Returns ("job", job_data),
+    ("browser", job) when the page only renders with JavaScript,
+    ("retry", job) after a throttling status or transport error, or None.
+    """
+    url = job.get('link')
+    try:
+        page_html = await fetch_page(client, semaphore, url)
+        with METRICS.timer("parse_seconds", source="bdjobs", fetcher="http"):
+            job_data = parse_detail_html(page_html, job, url)
+    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+        status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+        METRICS.inc("page_errors", source="bdjobs", fetcher="http")
+        if status is None or status in THROTTLE_STATUSES:
+            # The limiter has backed off already; a browser would only hit the throttling host again.
+            logging.warning(f"HTTP fetch failed for {url} ({status or type(e).__name__}); will retry after backing off.")
+            return ("retry", job)
+        logging.warning(f"HTTP fetch failed for {url} ({status}); skipped.")
+        return None
+    except Exception as e:
+        logging.warning(f"Could not scrape {url}: {e}")
+        METRICS.inc("page_errors", source="bdjobs", fetcher="http")
+        return None
+
+    if job_data is None:
+        # No job summary in the HTML: the page only renders with JavaScript.
+        METRICS.inc("browser_fallbacks", source="bdjobs")
+        return ("browser", job)
+    return ("job", job_data)
+
+async def stream_details_async(links):
+    """
+    Fetches and parses the detail pages over one client, keeping
+    MAX_CONCURRENCY pages in flight until the links run out, and yields
+    ("job", job_data) or ("browser", job) as each page completes.
+    Pages that failed with a throttling status or a transport error go
+    back into the queue up to RETRY_ROUNDS times, paced by the backed-off
+    rate limiter; only pages without the job summary go to the browser.
+    """
+    pending = deque((0, job) for job in links if job.get('link'))
+    in_flight = {}
+    given_up = 0
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+    async with httpx.AsyncClient(headers=HEADERS, timeout=REQUEST_TIMEOUT, limits=limits, follow_redirects=True) as client:
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < MAX_CONCURRENCY:
+                    attempt, job = pending.popleft()
+                    in_flight[asyncio.ensure_future(_scrape_one(client, semaphore, job))] = attempt
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = in_flight.pop(task)
+                    outcome = task.result()
+                    if outcome is None:
+                        continue
+                    kind, item = outcome
+                    if kind != "retry":
+                        yield outcome
+                    elif attempt < RETRY_ROUNDS:
+                        METRICS.inc("retries", source="bdjobs")
+                        pending.append((attempt + 1, item))
+                    else:
+                        given_up += 1
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    if given_up:
+        logging.warning(f"BDJobs HTTP: giving up on {given_up} pages for this run.")
+
+async def scrape_details_async(links):
+    """
+    Collects stream_details_async(links).
+    Returns (parsed_jobs, jobs_needing_browser).
+    """
+    parsed, needs_browser = [], []
+    async for kind, item in stream_details_async(links):
+        (parsed if kind == "job" else needs_browser).append(item)
+    return parsed, needs_browser
+
+async def _pump(links, outcomes):
+    """Runs stream_details_async(links) to completion, handing each outcome to the `outcomes` queue."""
+    error = None
+    try:
+        async for outcome in stream_details_async(links):
+            outcomes.put(outcome)
+    except asyncio.CancelledError:
+        pass  # iter_details was closed before the links ran out
+    except Exception as e:
+        error = e
+    finally:
+        outcomes.put(("done", error))
+
+def iter_details(links, pool=None, batch_size=BATCH_SIZE):
+    """
+    Streams BDJobs detail records. One event loop, in a background
+    thread, fetches every page over plain HTTP + lxml with a single
+    keep-alive client while this generator yields the records as they
+    complete; pages that need JavaScript go through Selenium here,
+    batch_size at a time, without stopping the HTTP fetches.
+    """
+    outcomes = queue.Queue()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(_pump(links, outcomes))
+    thread = threading.Thread(target=loop.run_until_complete, args=(task,), name="bdjobs-http", daemon=True)
+    thread.start()
+
+    parsed, needs_browser, rendered = 0, [], 0
+    try:
+        while True:
+            kind, item = outcomes.get()
+            if kind == "done":
+                if item is not None:
+                    raise item
+                break
+            if kind == "job":
+                parsed += 1
+                yield item
+                continue
+            needs_browser.append(item)
+            if len(needs_browser) >= batch_size:
+                rendered += len(needs_browser)
+                yield from _render(needs_browser, pool)
+                needs_browser = []
+
+        logging.info(f"BDJobs HTTP: parsed {parsed} pages, {rendered + len(needs_browser)} need a browser.")
+        yield from _render(needs_browser, pool)
+    finally:
+        # Stops the fetches when the consumer closes the stream early.
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+        loop.close()
+
+def _render(links, pool):
+    """The Selenium fallback for pages without the job summary (archived rendered pages in replay mode)."""
+    if not links:
+        return iter(())
+    if page_archive.replaying():
+        return replay_rendered(links)
+    return bd_jobs_job_scrapper.iter_details(links, pool=pool)
+
+def replay_rendered(links):
+    """Replay counterpart of the Selenium fallback: parses the archived rendered pages."""
+    for job in links:
+        url = job.get('link')
+        try:
+            job_data = parse_detail_html(page_archive.replay(url, "rendered"), job, url)
+        except Exception as e:
+            logging.warning(f"Replay: no usable rendered page for {url}: {e}")
+            job_data = None
+        if job_data is None:
+            METRICS.inc("page_errors", source="bdjobs", fetcher="replay")
+        else:
+            yield job_data
+
+def scrape_details_memory(links, pool=None):
+    """
+    Drop-in replacement for bd_jobs_job_scrapper.scrape_details_memory:
+    plain HTTP + lxml first, Selenium only for pages that need JavaScript.
+    """
+    return list(iter_details(links, pool))
@@ -1,14 +1,26 @@
 import time
 import json
-import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from urllib.parse import urlparse
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import driver_pool
+from metrics import METRICS
+from rate_limiter import get_limiter
+import page_archive
+
+# --- Page Layout (shared with the HTTP detail scraper) ---
+RESPONSIBILITIES_XPATH = "//*[@id='responsibilitiesSection']"
+EDUCATION_XPATH = "//*[@id='requirements']/div[1]"
+EXPERIENCE_XPATH = "//*[@id='requirements']/div[2]"
+ADDITIONAL_REQUIREMENTS_XPATH = "//*[@id='requirements']/div[3]"
+BENEFITS_XPATH = "//*[@id='salary']"
+VACANCY_XPATH = "//strong[contains(text(), 'Vacancy')]/following-sibling::span"
+COMPANY_XPATH = "/html/body/app-root/app-layout/div[2]/app-job-details/div/div/div[1]/div/div[1]/div/div/div[1]/div/div/h2[1]"
+SKILLS_XPATH = "//*[@id='skills']/div"
+EMPLOYMENT_STATUS_XPATH = '/html/body/app-root/app-layout/div[2]/app-job-details/div/div/div[1]/div/div[1]/div/div/div[6]/div[3]/div/div/div[4]'
+INFO_XPATH = '//*[@id="allSection"]/ul/div'
 
 # --- Helper Function to Correctly Scrape Lists ---
 def extract_list_items(driver, parent_xpath):
@@ -25,113 +37,139 @@ def extract_list_items(driver, parent_xpath):
     except NoSuchElementException:
         return []
 
-# --- 1. Setup Headless Browser and Anti-Detection Options ---
-def setup_driver():
-    options = Options()
-    options.add_argument("--headless=new")  # Updated headless argument
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--log-level=3")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-    service = ChromeService(executable_path=ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
-
-
-
-def scrape_details_memory(links):
-    driver = setup_driver()
-    all_job_details = []
+def parse_info_texts(info_texts):
+    """
+    Splits the 'allSection' summary lines into
+    (published, age, salary, location).
+    """
+    published, age, salary, location = "Not found", "Not found", "Not found", "Not found"
+    for info_text in info_texts:
+        text_lower = info_text.lower()
+        if "published" in text_lower:
+            published = info_text.replace("Published:", "").strip()
+        elif "age" in text_lower:
+            age = info_text.replace("Age:", "").strip()
+        elif "salary" in text_lower:
+            salary = info_text.replace("Salary:", "").strip()
+        elif "location" in text_lower:
+            location = info_text.replace("location:", "").strip()
+    return published, age, salary, location
+
+def build_job_data(job, url, fields):
+    """Combines the listing entry and the extracted detail fields into one record."""
+    return {
+        'title': job.get('title'),
+        'company_name': fields['company_name'],
+        'deadline': job.get('deadline'),
+        'url': url,
+        'responsibilities': fields['responsibilities'],
+        'employment_status': fields['employment_status'].strip(),
+        'education': fields['education'],
+        'experience': fields['experience'],
+        'additional_requirements': fields['additional_requirements'],
+        'vacancy': fields['vacancy'].strip(),
+        'location': fields['location'].strip(),
+        'age': fields['age'].strip(),
+        'salary': fields['salary'].strip(),
+        'other_benefits': fields['other_benefits'],
+        'published': fields['published'].strip(),
+        'skills': fields['skills'],
+    }
+
+def scrape_details_memory(links, pool=None):
+    return list(iter_details(links, pool))
+
+def iter_details(links, pool=None):
+    """Scrapes the detail pages one by one with Selenium, yielding each record."""
 
     # --- 3. Loop Through Links and Scrape Details ---
-    for i, job in enumerate(links):
-        url = job
-        url = job.get('link')
-        if not url:
-            continue
-
-        print(f"Scraping link {i+1}/{len(links)}: {url}")
+    with driver_pool.borrowed(pool) as drivers:
+        for i, job in enumerate(links):
+            url = job
+            url = job.get('link')
+            if not url:
+                continue
+
+            print(f"Scraping link {i+1}/{len(links)}: {url}")
         
-        driver.get(url)
+            limiter = get_limiter(urlparse(url).netloc)
+            with METRICS.timer("rate_limit_wait_seconds", source="bdjobs"):
+                limiter.wait()
+
+            with drivers.lease() as driver:
+                load_start = time.perf_counter()
         
-        try:
+                try:
+                    driver.get(url)
             
-            wait = WebDriverWait(driver,30) 
-            wait.until(EC.visibility_of_element_located(((By.ID, "sum"))))
+                    wait = WebDriverWait(driver,30) 
+                    wait.until(EC.visibility_of_element_located(((By.ID, "sum"))))
+                    latency = time.perf_counter() - load_start
+                    limiter.feedback(latency=latency)
+                    METRICS.observe("fetch_seconds", latency, source="bdjobs", fetcher="selenium")
+                    METRICS.inc("pages_fetched", source="bdjobs", fetcher="selenium")
+                    if page_archive.ARCHIVE_MODE == "record":
+                        page_archive.record(url, driver.page_source, kind="rendered")
+                    parse_start = time.perf_counter()
             
-            # --- Data Extraction ---
+                    # --- Data Extraction ---
 
-            responsibilities = extract_list_items(driver, "//*[@id='responsibilitiesSection']")
-            education = extract_list_items(driver, "//*[@id='requirements']/div[1]")
-            experience = extract_list_items(driver, "//*[@id='requirements']/div[2]")
-            add_req = extract_list_items(driver, "//*[@id='requirements']/div[3]")
-            other_benefits = extract_list_items(driver, "//*[@id='salary']")
+                    responsibilities = extract_list_items(driver, RESPONSIBILITIES_XPATH)
+                    education = extract_list_items(driver, EDUCATION_XPATH)
+                    experience = extract_list_items(driver, EXPERIENCE_XPATH)
+                    add_req = extract_list_items(driver, ADDITIONAL_REQUIREMENTS_XPATH)
+                    other_benefits = extract_list_items(driver, BENEFITS_XPATH)
             
 
-            try:
-                vacancy = driver.find_element(By.XPATH, "//strong[contains(text(), 'Vacancy')]/following-sibling::span").text
-            except NoSuchElementException:
-                vacancy = "Not specified"
-            try:
-                company_name = driver.find_element(By.XPATH, "/html/body/app-root/app-layout/div[2]/app-job-details/div/div/div[1]/div/div[1]/div/div/div[1]/div/div/h2[1]").text
-            except:
-                company_name = "Not found"
-            try:
-                skills_container = driver.find_element(By.XPATH, "//*[@id='skills']/div")
-                skills = [skill.strip() for skill in skills_container.text.split('\n') if skill.strip()]
-            except NoSuchElementException:
-                skills = []
+                    try:
+                        vacancy = driver.find_element(By.XPATH, VACANCY_XPATH).text
+                    except NoSuchElementException:
+                        vacancy = "Not specified"
+                    try:
+                        company_name = driver.find_element(By.XPATH, COMPANY_XPATH).text
+                    except:
+                        company_name = "Not found"
+                    try:
+                        skills_container = driver.find_element(By.XPATH, SKILLS_XPATH)
+                        skills = [skill.strip() for skill in skills_container.text.split('\n') if skill.strip()]
+                    except NoSuchElementException:
+                        skills = []
             
 
-            try:
-                employment_status = driver.find_element(By.XPATH, '/html/body/app-root/app-layout/div[2]/app-job-details/div/div/div[1]/div/div[1]/div/div/div[6]/div[3]/div/div/div[4]').text.split("\n")[1]
-
-            except NoSuchElementException:
-                employment_status = "Not found"
-            
+                    try:
+                        employment_status = driver.find_element(By.XPATH, EMPLOYMENT_STATUS_XPATH).text.split("\n")[1]
 
-            published, age, salary, location = "Not found", "Not found", "Not found", "Not found"
-            info_elements = driver.find_elements(By.XPATH, '//*[@id="allSection"]/ul/div')
-            for info_text in [element.text for element in info_elements]:
-                text_lower = info_text.lower()
-                if "published" in text_lower:
-                    published = info_text.replace("Published:", "").strip()
-                elif "age" in text_lower:
-                    age = info_text.replace("Age:", "").strip()
-                elif "salary" in text_lower:
-                    salary = info_text.replace("Salary:", "").strip()
-                elif "location" in text_lower:
-                    location = info_text.replace("location:", "").strip()
-
-            # Combine all data
-            job_data = {
-                'title': job.get('title'),
-                'company_name': company_name,
-                'deadline': job.get('deadline'),
-                'url': url,
-                'responsibilities': responsibilities,
-                'employment_status': employment_status.strip(),
-                'education': education,
-                'experience': experience,
-                'additional_requirements': add_req,
-                'vacancy': vacancy.strip(),
-                'location': location.strip(),
-                'age': age.strip(),
-                'salary': salary.strip(),
-                'other_benefits': other_benefits,
-                'published': published.strip(),
-                'skills': skills,
-            }
-            all_job_details.append(job_data)
+                    except NoSuchElementException:
+                        employment_status = "Not found"
             
 
-            time.sleep(random.uniform(6, 13))
-
-        except (TimeoutException, Exception) as e:
-            print(f"Could not process {url}. Error: {e}")
-
-    
-    driver.quit()
-    return all_job_details
\ No newline at end of file
+                    info_elements = driver.find_elements(By.XPATH, INFO_XPATH)
+                    published, age, salary, location = parse_info_texts([element.text for element in info_elements])
+
+                    # Combine all data
+                    job_data = build_job_data(job, url, {
+                        'company_name': company_name,
+                        'responsibilities': responsibilities,
+                        'employment_status': employment_status,
+                        'education': education,
+                        'experience': experience,
+                        'additional_requirements': add_req,
+                        'vacancy': vacancy,
+                        'location': location,
+                        'age': age,
+                        'salary': salary,
+                        'other_benefits': other_benefits,
+                        'published': published,
+                        'skills': skills,
+                    })
+                    METRICS.observe("parse_seconds", time.perf_counter() - parse_start, source="bdjobs", fetcher="selenium")
+                    yield job_data
+
+                except TimeoutException as e:
+                    # No job summary after 30s: treat as a slowdown/blocking signal.
+                    limiter.feedback(error=True)
+                    METRICS.inc("page_errors", source="bdjobs", fetcher="selenium")
+                    print(f"Could not process {url}. Error: {e}")
+                except Exception as e:
+                    METRICS.inc("page_errors", source="bdjobs", fetcher="selenium")
+                    print(f"Could not process {url}. Error: {e}")
@@ -1,74 +1,103 @@
 import requests
-from bs4 import BeautifulSoup
+from html_parser import parse_html, has_class, first, text
 import json
 import logging
-import time
-import random
+import dedup
+import http_cache
+import page_archive
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def scrape_bdjobs():
+SEARCH_URL = "https://jobs.bdjobs.com/jobsearch.asp?txtsearch=&fcat=8&qOT=0&iCat=0&Country=0&qPosted=0&qDeadline=0&Newspaper=0&qJobNature=0&qJobLevel=0&qExp=0&qAge=0&hidOrder=&pg={page_num}&rpp=100&hidJobSearch=JobSearch&MPostings=&ver=&strFlid_fvalue=&strFilterName=&hClickLog=1&earlyAccess=0&fcatId=8&hPopUpVal=1"
+
+JOB_CARD_CLASSES = ("norm-jobs-wrapper", "norm-job-block", "sout-job-block", "job-block")
+JOB_CARD_XPATH = "//div[" + " or ".join(has_class(name) for name in JOB_CARD_CLASSES) + "]"
+JOB_LINK_XPATH = f".//div[{has_class('job-title-text')}]//a"
+DEADLINE_XPATHS = (f".//div[{has_class('dead-text')}]", f".//div[{has_class('dead-line')}]")
+MAX_PAGES = 10             # Incremental crawl: newest pages first, stops earlier at the watermark
+BACKFILL_MAX_PAGES = 100   # Backfill: walks the whole listing (up to this many pages), no watermark
+
+def parse_listing_page(content):
+    """
+    Extracts {title, link, deadline} for every job card of a listing page.
+    Returns an empty list when the page has no job blocks (past the last page).
+    """
+    tree = parse_html(content)
+    if tree is None:
+        return []
+
+    page_jobs = []
+    for job_card in tree.xpath(JOB_CARD_XPATH):
+        link_tag = first(job_card.xpath(JOB_LINK_XPATH))
+        if link_tag is None or link_tag.get('href') is None:
+            continue
+
+        deadline_element = next((el for xpath in DEADLINE_XPATHS for el in job_card.xpath(xpath)), None)
+
+        page_jobs.append({
+            'title': text(link_tag),
+            'link': link_tag.get('href'),
+            'deadline': text(deadline_element) if deadline_element is not None else "Not specified",
+        })
+
+    return page_jobs
+
+def scrape_bdjobs(journal=None, session=None, watermark=None, max_pages=MAX_PAGES):
+    """
+    Crawls the IT listing page by page (newest first). With a
+    `dedup.ListingWatermark` the crawl stops at the first page that holds
+    nothing new; without one (backfill) it goes up to `max_pages`.
+    """
 
-    base_url = "https://jobs.bdjobs.com/"
     all_jobs_data = []
-    x = random.randint(2, 6)
+    owns_session = session is None
+    if owns_session:
+        session = http_cache.CachedSession()
     
-    for page_num in range(1, x):
+    for page_num in range(1, max_pages + 1):
         
-        search_url = f"https://jobs.bdjobs.com/jobsearch.asp?txtsearch=&fcat=8&qOT=0&iCat=0&Country=0&qPosted=0&qDeadline=0&Newspaper=0&qJobNature=0&qJobLevel=0&qExp=0&qAge=0&hidOrder=&pg={page_num}&rpp=100&hidJobSearch=JobSearch&MPostings=&ver=&strFlid_fvalue=&strFilterName=&hClickLog=1&earlyAccess=0&fcatId=8&hPopUpVal=1"
+        if journal is not None and journal.is_done('bdjobs_page', page_num):
+            page_jobs = journal.get('bdjobs_page', page_num)
+            logging.info(f"--- Page {page_num} already in the run journal ({len(page_jobs)} jobs) ---")
+            if not page_jobs:
+                break
+            all_jobs_data.extend(page_jobs)
+            if watermark is not None and watermark.reached(page_jobs):
+                logging.info(f"Page {page_num} holds no new jobs; incremental crawl stops here.")
+                break
+            continue
+
+        search_url = SEARCH_URL.format(page_num=page_num)
         logging.info(f"--- Scraping page {page_num}: {search_url} ---")
 
         try:
+            response = session.get(search_url, timeout=15)
 
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(search_url, timeout=15, headers=headers)
-            
-
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
+            # Unchanged page (304 or same content hash): reuse the jobs parsed last time.
+            page_jobs = None if response.changed else session.get_parsed(response)
+            if page_jobs is None:
+                page_jobs = parse_listing_page(response.content)
+                session.set_parsed(response, page_jobs)
+            else:
+                logging.info(f"Page {page_num} unchanged since the last run; skipped parsing.")
 
-            job_blocks = soup.find_all('div', class_=['norm-jobs-wrapper', 'norm-job-block', 'sout-job-block', 'job-block'])
+            if journal is not None:
+                journal.record('bdjobs_page', page_num, page_jobs)
 
-            if not job_blocks:
+            if not page_jobs:
                 logging.warning(f"No job postings found on page {page_num}. This might be the last page.")
                 break 
 
-            logging.info(f"Found {len(job_blocks)} job postings on page {page_num}. Extracting details...")
-
-            for job_card in job_blocks:
-                job_info = {}
-
-
-                title_element = job_card.find('div', class_='job-title-text')
-                if title_element and title_element.find('a'):
-                    link_tag = title_element.find('a')
-
-                    job_info['title'] = link_tag.get_text(strip=True)
-
-                    job_info['link'] = link_tag['href']
-                else:
-
-                    continue
-
-
-                deadline_element = job_card.find('div', class_='dead-text')
-                if not deadline_element: 
-                    deadline_element = job_card.find('div', class_='dead-line')
-
-                if deadline_element:
-                    job_info['deadline'] = deadline_element.get_text(strip=True)
-                else:
-                    job_info['deadline'] = "Not specified"
-
-                all_jobs_data.append(job_info)
+            logging.info(f"Found {len(page_jobs)} job postings on page {page_num}.")
+            all_jobs_data.extend(page_jobs)
 
-            # delay of 2 seconds 
-            time.sleep(2)
+            if watermark is not None and watermark.reached(page_jobs):
+                logging.info(f"Page {page_num} holds no new jobs; incremental crawl stops here.")
+                break
 
+        except page_archive.ReplayMiss as e:
+            logging.info(f"{e}; replayed listing ends here.")
+            break
         except requests.exceptions.RequestException as e:
             logging.error(f"An error occurred while fetching page {page_num}: {e}")
             continue 
@@ -76,11 +105,15 @@ def scrape_bdjobs():
             logging.error(f"An unexpected error occurred on page {page_num}: {e}")
             continue
 
+    if owns_session:
+        session.close()
 
-    return all_jobs_data
+    # The same job shows up on several listing pages with different query params.
+    return dedup.dedupe_listing(all_jobs_data)
 
 
 
+# Imports project-root modules: run from the root as `python3 -m BDJobs.bd_jobs_link_scrapper`.
 if __name__ == '__main__':
     scrape_bdjobs()
 
@@ -1,6 +1,5 @@
 import json, re
 from rapidfuzz import fuzz, process
-from collections import Counter
 
 # -------- CONFIG --------
 INPUT_JSON = "BRAC_Project/Job_Post_Scrapping/Shomvob/links.json"
@@ -48,52 +47,74 @@ def normalize(text):
     text = re.sub(r"\s+", " ", text).strip()
     return text
 
-def keyword_hits(text, keywords):
-    text_n = normalize(text)
-    hits = [kw for kw in keywords if kw in text_n]
-    return hits
+class ITClassifier:
+    """
+    IT_KEYWORDS compiled once for batch classification.
+    Keywords are normalized like the job text (so the ' IT Support' style
+    entries can actually match), exact hits come from one regex pass per job,
+    and fuzzy scores for the whole batch come from a single rapidfuzz cdist call.
+    Fuzzy matching uses token_sort_ratio, which scores whole titles against
+    whole keywords, so one shared word ("specialist", "manager") is not enough;
+    it only counts from FUZZY_SCORE_THRESHOLD up (catches typos and plurals).
+    """
 
-def fuzzy_best_score(text, keywords):
-    text_n = normalize(text)
-    best = 0
-    best_kw = None
-    for kw in keywords:
-        s = fuzz.token_set_ratio(kw, text_n)  # 0-100
-        if s > best:
-            best = s
-            best_kw = kw
-    return best, best_kw
+    def __init__(self, keywords=IT_KEYWORDS):
+        normalized = (normalize(kw) for kw in keywords)
+        # Single letters are what "c++"/"c#" collapse to after normalization; they would match everywhere.
+        self.keywords = list(dict.fromkeys(kw for kw in normalized if len(kw) > 1))
 
+        # Longest first so "data scientist" is reported over "data" at the same position;
+        # the lookahead lets matches overlap ("software developer" and "developer").
+        alternation = "|".join(re.escape(kw) for kw in sorted(self.keywords, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?=(?<!\w)({alternation})(?!\w))")
 
-def filter_it_jobs_memory(jobs):
+    def keyword_hits(self, text_n):
+        """Exact keyword hits in already-normalized text."""
+        return list(dict.fromkeys(self.pattern.findall(text_n)))
+
+    def classify(self, jobs):
+        """Returns one heuristic dict per job, in order."""
+        texts = [normalize(" ".join([j.get("title", "") or "", j.get("description", "") or ""])) for j in jobs]
+        if not texts:
+            return []
+
+        scores = process.cdist(texts, self.keywords, scorer=fuzz.token_sort_ratio, workers=-1)
+        best_idx = scores.argmax(axis=1)
+
+        heuristics = []
+        for row, text_n in enumerate(texts):
+            hits = self.keyword_hits(text_n)
+            fuzzy_score = float(scores[row, best_idx[row]])
+
+            # combine heuristic: prefer exact keyword hits but also accept fuzzy high score
+            score = 0.0
+            if len(hits) >= KEYWORD_MATCH_MIN:
+                score += 0.7
+            if fuzzy_score >= FUZZY_SCORE_THRESHOLD:
+                score += (fuzzy_score / 100.0) * 0.3
+
+            heuristics.append({
+                "keyword_hits": hits,
+                "fuzzy_score": fuzzy_score,
+                "fuzzy_kw": self.keywords[best_idx[row]] if fuzzy_score > 0 else None,
+                "combined_score": round(score, 3)
+            })
+        return heuristics
+
+
+CLASSIFIER = ITClassifier()
+
+
+def filter_it_jobs_memory(jobs, classifier=CLASSIFIER):
     it_list = []
     non_it_list = []
 
-    for j in jobs:
-        title = j.get("title", "") or ""
-        desc = j.get("description", "") or ""   
-        text = " ".join([title, desc])
-
-        hits = keyword_hits(text, IT_KEYWORDS)
-        fuzzy_score, fuzzy_kw = fuzzy_best_score(text, IT_KEYWORDS)
-
-        # combine heuristic: prefer exact keyword hits but also accept fuzzy high score
-        score = 0.0
-        if len(hits) >= KEYWORD_MATCH_MIN:
-            score += 0.7 
-        
-        score += (fuzzy_score / 100.0) * 0.3
-
-        j["_heuristic"] = {
-            "keyword_hits": hits,
-            "fuzzy_score": fuzzy_score,
-            "fuzzy_kw": fuzzy_kw,
-            "combined_score": round(score, 3)
-        }
-
-        if score >= COMBINED_SCORE_THRESHOLD:
+    for j, heuristic in zip(jobs, classifier.classify(jobs)):
+        j["_heuristic"] = heuristic
+
+        if heuristic["combined_score"] >= COMBINED_SCORE_THRESHOLD:
             it_list.append(j)
         else:
             non_it_list.append(j)
-        
-        return it_list
\ No newline at end of file
+
+    return it_list
@@ -3,53 +3,68 @@ import json
 import random
 import logging
 from datetime import datetime  # Added for current date
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from html_parser import parse_html, has_class, first, text, text_parent, self_and_ancestors, next_sibling, to_html
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 import re
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import driver_pool
+import sinks
+import page_archive
+from http_cache import CachedSession, CACHE_DIR
+from rate_limiter import get_limiter
+from metrics import METRICS
 
 # --- CONFIGURATION ---
 INPUT_FILE = 'BRAC_Project/Job_Post_Scrapping/Shomvob/filtered.json' 
 OUTPUT_FILE = 'BRAC_Project/Job_Post_Scrapping/Shomvob/shomvob_job_details.json'
+BASE_URL = "https://app.shomvob.co/"
+DETAIL_WORKERS = 4          # Browsers scraping detail pages in parallel
+RENDER_TIMEOUT = 10         # Max wait for the job page to render its content
+RENDERED_SELECTOR = 'script[type="application/ld+json"], [class*="font-bold"]'
+GRID_LABELS = ("Vacancy", "Experience", "Education", "Deadline", "Employment Type", "Location")
+SALARY_PATTERN = re.compile(r"(TK\.|Tk\.|৳|Salary)", re.I)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s", datefmt="%H:%M:%S")
 
-def setup_driver():
-    opts = Options()
-    opts.add_argument("--start-maximized")
-    opts.add_argument("--headless=new") 
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36")
-    driver = webdriver.Chrome(options=opts)
-    return driver
-
-def extract_json_ld(soup):
-    """Extracts the hidden JSON-LD schema."""
-    try:
-        script = soup.find('script', type='application/ld+json')
-        if script:
-            data = json.loads(script.string)
-            if isinstance(data, list):
-                for item in data:
-                    if item.get('@type') == 'JobPosting':
-                        return item
-            elif data.get('@type') == 'JobPosting':
-                return data
-    except Exception as e:
-        pass
-    return {}
-
-def get_visual_grid_data(soup, label):
+def _label_div(element, label):
+    """
+    Outermost div, starting at `element` (the parent of a text node equal to
+    `label`), whose whole text is exactly `label`; None if the nearest div already has more.
+    """
+    label_div = None
+    for div in self_and_ancestors(element, "div"):
+        if text(div) != label:
+            break
+        label_div = div
+    return label_div
+
+def find_label_div(tree, label):
+    """
+    Outermost div whose whole text is exactly `label` (what a find() over all
+    divs comparing their text returns), found from the matching text nodes
+    instead of reading the text of every div of the page.
+    """
+    for node in tree.xpath("//text()"):
+        if node.strip() == label:
+            label_div = _label_div(text_parent(node), label)
+            if label_div is not None:
+                return label_div
+    return None
+
+def get_visual_grid_data(tree, label):
     """Finds a label in the grid and gets the sibling text."""
     try:
-        label_div = soup.find(lambda tag: tag.name == "div" and tag.get_text(strip=True) == label)
-        if label_div:
-            value_div = label_div.find_next_sibling("div")
-            if value_div:
-                return value_div.get_text(strip=True)
+        label_div = find_label_div(tree, label)
+        if label_div is not None:
+            value_div = next_sibling(label_div, "div")
+            if value_div is not None:
+                return text(value_div)
     except:
         pass
     return "Not found"
@@ -61,305 +76,413 @@ def clean_html_to_list(html_content):
     
 
     html_content = str(html_content).replace("<br>", "\n").replace("<br/>", "\n").replace("</p>", "\n")
-    soup = BeautifulSoup(html_content, "html.parser")
+    tree = parse_html(html_content)
+    if tree is None:
+        return []
     items = []
     
 
-    li_tags = soup.find_all('li')
+    li_tags = tree.xpath("//li")
     if li_tags:
         for li in li_tags:
-            text = li.get_text(strip=True)
-            if text: items.append(text)
+            li_text = text(li)
+            if li_text: items.append(li_text)
     else:
 
-        text_block = soup.get_text("\n")
+        text_block = "\n".join(tree.xpath("//text()[not(parent::script or parent::style)]"))
         items = [line.strip() for line in text_block.split('\n') if len(line.strip()) > 2]
 
     return items
 
-def get_salary_visual(soup):
-    """Fallback to find salary visually using Regex."""
-    try:
-        salary_node = soup.find(string=re.compile(r"(TK\.|Tk\.|৳|Salary)", re.I))
-        if salary_node:
-            return salary_node.parent.get_text(strip=True)
-    except:
-        pass
-    return "Negotiable"
-
-def get_company_visual(soup):
+def get_company_visual(tree):
     """Robust fallback for company name."""
     try:
 
-        logo = soup.find("img", class_=lambda x: x and "object-contain" in x)
-        if logo and logo.get("alt"):
+        logo = first(tree.xpath("//img[contains(@class, 'object-contain')]"))
+        if logo is not None and logo.get("alt"):
             return logo.get("alt")
             
 
-        title_node = soup.find("div", class_=re.compile(r"font-bold"))
-        if title_node:
+        title_node = first(tree.xpath("//div[contains(@class, 'font-bold')]"))
+        if title_node is not None:
 
-            company_node = title_node.find_next("div", class_=re.compile(r"Text-Secondary"))
-            if company_node:
-                return company_node.get_text(strip=True)
+            company_node = first(title_node.xpath(
+                "(descendant::div | following::div)[contains(@class, 'Text-Secondary')]"
+            ))
+            if company_node is not None:
+                return text(company_node)
     except:
         pass
     return "Not specified"
 
-def scrape_details():
-    driver = setup_driver()
-    all_job_data = []
-
+def load_job_page(driver, url, limiter):
+    """
+    Opens `url` and waits until the job content (JSON-LD or the title) has
+    rendered, instead of a fixed sleep. The load time is reported to the
+    adaptive `limiter`; a page that never renders counts as an error.
+    """
+    start = time.perf_counter()
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            jobs_to_scrape = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: {INPUT_FILE} not found.")
-        return
-
-    print(f"loaded {len(jobs_to_scrape)} links. Starting scrape...")
-
-    for i, job_entry in enumerate(jobs_to_scrape):
-        url = job_entry.get('link') or job_entry.get('url')
-        if not url: continue
-
-        print(f"[{i+1}/{len(jobs_to_scrape)}] Processing: {url}")
-        
-        try:
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            time.sleep(2) 
-
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, "html.parser")
-            schema = extract_json_ld(soup)
-            
-            
-            grid_vacancy = get_visual_grid_data(soup, "Vacancy")
-            grid_experience = get_visual_grid_data(soup, "Experience")
-            grid_education = get_visual_grid_data(soup, "Education")
-            
-            
-            published_raw = datetime.now().strftime("%d %b %Y")
-
-            
-            responsibilities_list = []
-            
-            
-            resp_html = schema.get('responsibilities', '') 
-            if not resp_html: 
-                resp_html = schema.get('description', '')
-            
-            if resp_html:
-                responsibilities_list = clean_html_to_list(resp_html)
-            
-            
-            if not responsibilities_list:
-                try:
-                    resp_header = soup.find(lambda tag: tag.name == "div" and "Responsibilities" in tag.get_text())
-                    if resp_header:
-
-                        content_div = resp_header.find_next_sibling("div")
-                        if not content_div: 
-                            content_div = resp_header.parent.find_next_sibling("div")
-                        if content_div:
-                            responsibilities_list = clean_html_to_list(str(content_div))
-                except: pass
-
-
-            company = schema.get('hiringOrganization', {}).get('name')
-
-            if not company or company.lower() == "shomvob": 
-                company = get_company_visual(soup)
-
-
-            salary = "Negotiable"
-            if schema.get('baseSalary'):
-                try:
-                    val = schema['baseSalary'].get('value', {})
-                    min_s = val.get('minValue') or schema['baseSalary'].get('minValue')
-                    max_s = val.get('maxValue') or schema['baseSalary'].get('maxValue')
-                    if min_s:
-                        salary = f"Tk. {min_s}" + (f" - {max_s}" if max_s else "") + " (Monthly)"
-                except: pass
-            
-            if salary == "Negotiable":
-                vis_sal = get_salary_visual(soup)
-                if vis_sal: salary = vis_sal
-
-
-            benefits_list = schema.get('jobBenefits', [])
-            if not benefits_list:
-                ben_header = soup.find(string=re.compile("Benefits"))
-                if ben_header:
-                    try:
-                        parent = ben_header.find_parent("div").find_parent("div")
-                        benefits_list = [li.get_text(strip=True) for li in parent.find_all("div", class_="flex") if li.get_text(strip=True) and "Benefits" not in li.get_text(strip=True)]
-                    except: pass
-
-            final_data = {
-                "title": schema.get('title') or job_entry.get('title'),
-                "company": company,
-                "deadline": schema.get('validThrough') or get_visual_grid_data(soup, "Deadline"),
-                "url": url,
-                'responsibilities': responsibilities_list,
-                "employment_status": schema.get('employmentType') or get_visual_grid_data(soup, "Employment Type"),
-                "education": [grid_education] if grid_education != "Not found" else [],
-                "experience": [grid_experience] if grid_experience != "Not found" else [],
-                'additional_requirements': ["None specified"],
-                "vacancy": grid_vacancy,
-                "location": schema.get('jobLocation', {}).get('address', {}).get('addressLocality') or get_visual_grid_data(soup, "Location"),
-                'age': 'Not specified',
-                "salary": salary,
-                "other_benefits": benefits_list,
-                'published': published_raw,
-                "skills": schema.get('skills', [])
-            }
-
-            all_job_data.append(final_data)
-            logging.info(f" -> Scraped: {final_data['title']} | {final_data['salary']} | {final_data['company']}")
-
-        except Exception as e:
-            logging.error(f"Failed to scrape {url}: {e}")
-
-    driver.quit()
-
-   
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_job_data, f, indent=4, ensure_ascii=False)
-    print(f"Done! Saved {len(all_job_data)} jobs to {OUTPUT_FILE}")
-
-
-
-
-
-def scrape_details_memory(links):
-    driver = setup_driver()
-    all_job_data = []
-
-    
+        driver.get(url)
+        WebDriverWait(driver, RENDER_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, RENDERED_SELECTOR))
+        )
+    except TimeoutException:
+        limiter.feedback(error=True)
+        raise
+    latency = time.perf_counter() - start
+    limiter.feedback(latency=latency)
+
+    page_source = driver.page_source
+    page_archive.record(url, page_source, kind="rendered")
+    METRICS.observe("fetch_seconds", latency, source="shomvob", fetcher="selenium")
+    METRICS.inc("pages_fetched", source="shomvob", fetcher="selenium")
+    METRICS.inc("bytes_fetched", len(page_source.encode('utf-8')), source="shomvob")
+    return page_source
+
+class PageIndex:
+    """
+    Everything the visual fallbacks look for, collected in one pass over
+    the page's text nodes: the JSON-LD schema, the elements holding the grid
+    labels, and the first "Responsibilities", "Benefits" and salary text.
+    The fallbacks then resolve only the fields JSON-LD did not provide,
+    starting from these elements instead of scanning the whole tree again.
+    """
+
+    def __init__(self, tree, labels=GRID_LABELS):
+        self.tree = tree
+        self.schema = {}
+        self.label_parents = {label: [] for label in labels}
+        self.responsibilities_parent = None
+        self.benefits_parent = None
+        self.salary_parent = None
+
+        for node in tree.xpath("//text()"):
+            parent = text_parent(node)
+            if parent.tag in ("script", "style"):
+                if not self.schema and parent.tag == "script" and parent.get("type") == "application/ld+json":
+                    self.schema = _job_posting(node)
+                continue
+
+            stripped = node.strip()
+            if not stripped:
+                continue
+            if stripped in self.label_parents:
+                self.label_parents[stripped].append(parent)
+            if self.responsibilities_parent is None and "Responsibilities" in node:
+                self.responsibilities_parent = parent
+            if self.benefits_parent is None and "Benefits" in node:
+                self.benefits_parent = parent
+            if self.salary_parent is None and SALARY_PATTERN.search(node):
+                self.salary_parent = parent
+
+    def label_div(self, label):
+        """Same result as find_label_div(tree, label), from the indexed elements."""
+        for parent in self.label_parents.get(label, []):
+            label_div = _label_div(parent, label)
+            if label_div is not None:
+                return label_div
+        return None
+
+    def grid_value(self, label):
+        """Same result as get_visual_grid_data(tree, label)."""
+        label_div = self.label_div(label)
+        if label_div is not None:
+            value_div = next_sibling(label_div, "div")
+            if value_div is not None:
+                return text(value_div)
+        return "Not found"
+
+    def responsibilities(self):
+        if self.responsibilities_parent is None:
+            return []
+        divs = list(self_and_ancestors(self.responsibilities_parent, "div"))
+        if not divs:
+            return []
+        resp_header = divs[-1]
+        content_div = next_sibling(resp_header, "div")
+        if content_div is None:
+            content_div = next_sibling(resp_header.getparent(), "div")
+        return clean_html_to_list(to_html(content_div)) if content_div is not None else []
+
+    def salary(self):
+        if self.salary_parent is not None:
+            return text(self.salary_parent)
+        return "Negotiable"
+
+    def benefits(self):
+        if self.benefits_parent is None:
+            return []
+        section = next(self_and_ancestors(self.benefits_parent, "div"), None)
+        parent = first(section.xpath("ancestor::div[1]")) if section is not None else None
+        if parent is None:
+            return []
+        benefits = []
+        for div in parent.xpath(f".//div[{has_class('flex')}]"):
+            div_text = text(div)
+            if div_text and "Benefits" not in div_text:
+                benefits.append(div_text)
+        return benefits
+
+def _job_posting(script_text):
+    """The JobPosting object of one JSON-LD script, or {}."""
+    try:
+        data = json.loads(script_text)
+    except ValueError:
+        return {}
+    if isinstance(data, list):
+        return next((item for item in data if isinstance(item, dict) and item.get('@type') == 'JobPosting'), {})
+    if isinstance(data, dict) and data.get('@type') == 'JobPosting':
+        return data
+    return {}
 
-    for i, job_entry in enumerate(links):
+def _schema_text(value):
+    """A JSON-LD field usable as-is (plain text or number), else None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+def _schema_locality(schema):
+    location = schema.get('jobLocation')
+    if isinstance(location, list):
+        location = location[0] if location else None
+    if not isinstance(location, dict) or not isinstance(location.get('address'), dict):
+        return None
+    return location['address'].get('addressLocality')
+
+def _schema_salary(schema):
+    base = schema.get('baseSalary')
+    if not isinstance(base, dict):
+        return None
+    value = base.get('value') if isinstance(base.get('value'), dict) else {}
+    min_s = value.get('minValue') or base.get('minValue')
+    max_s = value.get('maxValue') or base.get('maxValue')
+    if not min_s:
+        return None
+    return f"Tk. {min_s}" + (f" - {max_s}" if max_s else "") + " (Monthly)"
+
+def parse_job_page(page_source, job_entry, url):
+    """
+    Extracts one Shomvob job record from the rendered page HTML.
+    JSON-LD fields are used first; the page is walked once (PageIndex) and
+    a visual fallback only runs for a field the schema does not have.
+    """
+    tree = parse_html(page_source)
+    page = PageIndex(tree)
+    schema = page.schema
+
+    vacancy = _schema_text(schema.get('totalJobOpenings')) or page.grid_value("Vacancy")
+    experience = _schema_text(schema.get('experienceRequirements')) or page.grid_value("Experience")
+    education = _schema_text(schema.get('educationRequirements')) or page.grid_value("Education")
+
+    resp_html = schema.get('responsibilities') or schema.get('description')
+    responsibilities_list = clean_html_to_list(resp_html) if resp_html else []
+    if not responsibilities_list:
+        responsibilities_list = page.responsibilities()
+
+    company = (schema.get('hiringOrganization') or {}).get('name')
+    if not company or company.lower() == "shomvob":
+        company = get_company_visual(tree)
+
+    final_data = {
+        "title": schema.get('title') or job_entry.get('title'),
+        "company": company,
+        "deadline": schema.get('validThrough') or page.grid_value("Deadline"),
+        "url": url,
+        'responsibilities': responsibilities_list,
+        "employment_status": schema.get('employmentType') or page.grid_value("Employment Type"),
+        "education": [education] if education != "Not found" else [],
+        "experience": [experience] if experience != "Not found" else [],
+        'additional_requirements': ["None specified"],
+        "vacancy": vacancy,
+        "location": _schema_locality(schema) or page.grid_value("Location"),
+        'age': 'Not specified',
+        "salary": _schema_salary(schema) or page.salary(),
+        "other_benefits": schema.get('jobBenefits') or page.benefits(),
+        'published': datetime.now().strftime("%d %b %Y"),
+        "skills": schema.get('skills', [])
+    }
+
+    logging.info(f" -> Scraped: {final_data['title']} | {final_data['salary']} | {final_data['company']}")
+    return final_data
+
+
+# --- FETCHERS ---
+# A fetcher turns a job URL into page HTML. Each one waits for the host's
+# shared limiter itself and is used as a context manager around a batch.
+
+class SeleniumFetcher:
+    """Renders pages in leased browsers from `pool` (or a private pool of `workers` drivers)."""
+
+    name = "selenium"
+
+    def __init__(self, pool=None, workers=DETAIL_WORKERS):
+        self.pool = pool
+        self.workers = workers
+        self.limiter = get_limiter(urlparse(BASE_URL).netloc)
+        self._borrowed = None
+
+    def __enter__(self):
+        self._borrowed = driver_pool.borrowed(self.pool, size=self.workers)
+        self.drivers = self._borrowed.__enter__()
+        if self.pool is None:
+            # Fill the private pool before the workers lease from it.
+            try:
+                self.drivers.start()
+            except BaseException:
+                self._borrowed.__exit__(None, None, None)
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        return self._borrowed.__exit__(*exc)
+
+    def fetch(self, url):
+        with METRICS.timer("rate_limit_wait_seconds", source="shomvob"):
+            self.limiter.wait()
+        with self.drivers.lease() as driver:
+            return load_job_page(driver, url, self.limiter)
+
+class HttpFetcher:
+    """
+    Plain GET through http_cache.CachedSession (which applies the rate
+    limiter). With `offline=True` pages come only from the cache directory:
+    the "cached HTML" fetcher for re-parsing recorded pages and benchmarks.
+    """
+
+    def __init__(self, session=None, cache_dir=CACHE_DIR, offline=False):
+        self.session = session
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.name = "cache" if offline or (session is not None and session.offline) else "http"
+        self._own = False
+
+    def __enter__(self):
+        if self.session is None:
+            self.session = CachedSession(self.cache_dir, offline=self.offline)
+            self._own = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._own:
+            self.session.close()
+            self.session, self._own = None, False
+        return False
+
+    def fetch(self, url):
+        return self.session.get(url).text
+
+FETCHERS = {
+    'selenium': lambda args: SeleniumFetcher(workers=args.workers),
+    'http': lambda args: HttpFetcher(cache_dir=args.cache_dir),
+    'cache': lambda args: HttpFetcher(cache_dir=args.cache_dir, offline=True),
+    'replay': lambda args: page_archive.ArchiveFetcher(),
+}
+
+
+# --- EXTRACTION CORE ---
+
+def read_links(path):
+    """
+    Job entries from a file: a JSON array (like filtered.json), or one
+    JSON object or bare URL per line, read lazily.
+    """
+    f = open(path, 'r', encoding='utf-8')
+    if path.endswith('.json'):
+        with f:
+            return json.load(f)
+    return _iter_link_lines(f)
+
+def _iter_link_lines(f):
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line) if line.startswith('{') else {'link': line}
+
+def extract(links, fetcher, workers=DETAIL_WORKERS):
+    """
+    Fetches and parses the detail page of every entry in `links` (a list,
+    or any iterable, consumed lazily) with `workers` threads and yields the
+    records in the same order as `links`. Failed pages are logged and skipped.
+    """
+    total = len(links) if hasattr(links, '__len__') else '?'
+
+    def scrape(i, job_entry):
         url = job_entry.get('link') or job_entry.get('url')
-        if not url: continue
-
-        print(f"[{i+1}/{len(links)}] Processing: {url}")
-        
+        logging.info(f"[{i+1}/{total}] Processing: {url}")
         try:
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            time.sleep(2) 
-
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, "html.parser")
-            schema = extract_json_ld(soup)
-            
-
-            grid_vacancy = get_visual_grid_data(soup, "Vacancy")
-            grid_experience = get_visual_grid_data(soup, "Experience")
-            grid_education = get_visual_grid_data(soup, "Education")
-            
-
-            published_raw = datetime.now().strftime("%d %b %Y")
-
-
-            responsibilities_list = []
-            
-
-            resp_html = schema.get('responsibilities', '') 
-            if not resp_html: 
-                resp_html = schema.get('description', '')
-            
-            if resp_html:
-                responsibilities_list = clean_html_to_list(resp_html)
-            
-
-            if not responsibilities_list:
-                try:
-                    resp_header = soup.find(lambda tag: tag.name == "div" and "Responsibilities" in tag.get_text())
-                    if resp_header:
-                        
-                        content_div = resp_header.find_next_sibling("div")
-                        if not content_div: 
-                            content_div = resp_header.parent.find_next_sibling("div")
-                        if content_div:
-                            responsibilities_list = clean_html_to_list(str(content_div))
-                except: pass
-
-
-            company = schema.get('hiringOrganization', {}).get('name')
-            
-            if not company or company.lower() == "shomvob": 
-                company = get_company_visual(soup)
-
-            
-            salary = "Negotiable"
-            if schema.get('baseSalary'):
-                try:
-                    val = schema['baseSalary'].get('value', {})
-                    min_s = val.get('minValue') or schema['baseSalary'].get('minValue')
-                    max_s = val.get('maxValue') or schema['baseSalary'].get('maxValue')
-                    if min_s:
-                        salary = f"Tk. {min_s}" + (f" - {max_s}" if max_s else "") + " (Monthly)"
-                except: pass
-            
-            if salary == "Negotiable":
-                vis_sal = get_salary_visual(soup)
-                if vis_sal: salary = vis_sal
-
-            
-            benefits_list = schema.get('jobBenefits', [])
-            if not benefits_list:
-                ben_header = soup.find(string=re.compile("Benefits"))
-                if ben_header:
-                    try:
-                        parent = ben_header.find_parent("div").find_parent("div")
-                        benefits_list = [li.get_text(strip=True) for li in parent.find_all("div", class_="flex") if li.get_text(strip=True) and "Benefits" not in li.get_text(strip=True)]
-                    except: pass
-
-            final_data = {
-                "title": schema.get('title') or job_entry.get('title'),
-                "company": company,
-                "deadline": schema.get('validThrough') or get_visual_grid_data(soup, "Deadline"),
-                "url": url,
-                'responsibilities': responsibilities_list,
-                "employment_status": schema.get('employmentType') or get_visual_grid_data(soup, "Employment Type"),
-                "education": [grid_education] if grid_education != "Not found" else [],
-                "experience": [grid_experience] if grid_experience != "Not found" else [],
-                'additional_requirements': ["None specified"],
-                "vacancy": grid_vacancy,
-                "location": schema.get('jobLocation', {}).get('address', {}).get('addressLocality') or get_visual_grid_data(soup, "Location"),
-                'age': 'Not specified',
-                "salary": salary,
-                "other_benefits": benefits_list,
-                'published': published_raw,
-                "skills": schema.get('skills', [])
-            }
-
-            all_job_data.append(final_data)
-            logging.info(f" -> Scraped: {final_data['title']} | {final_data['salary']} | {final_data['company']}")
-
+            page_source = fetcher.fetch(url)
+            with METRICS.timer("parse_seconds", source="shomvob", fetcher=fetcher.name):
+                return parse_job_page(page_source, job_entry, url)
         except Exception as e:
+            METRICS.inc("page_errors", source="shomvob", fetcher=fetcher.name)
             logging.error(f"Failed to scrape {url}: {e}")
+            return None
+
+    with fetcher, ThreadPoolExecutor(max_workers=workers) as executor:
+        # Re-order: records leave in input order; read-ahead is bounded so a
+        # generator of links is never pulled much further than the workers get.
+        window = deque()
+        for i, job_entry in enumerate(links):
+            if not (job_entry.get('link') or job_entry.get('url')):
+                continue
+            window.append(executor.submit(scrape, i, job_entry))
+            if len(window) >= 2 * workers:
+                final_data = window.popleft().result()
+                if final_data is not None:
+                    yield final_data
+        while window:
+            final_data = window.popleft().result()
+            if final_data is not None:
+                yield final_data
+
+def iter_details(links, pool=None, workers=DETAIL_WORKERS, fetcher=None):
+    """
+    Scrapes the detail pages of `links` (by default with `workers` browsers
+    in parallel) and yields each record as soon as it, and everything before
+    it, is done. All workers share the host's adaptive rate limiter, whose
+    ceiling is the host's `min_interval` in rate_limiter.HOST_POLICIES.
+    In replay mode the pages come from the page archive.
+    """
+    if fetcher is None:
+        fetcher = page_archive.ArchiveFetcher() if page_archive.replaying() else SeleniumFetcher(pool, workers)
+    return extract(links, fetcher, workers)
+
+def scrape_details_memory(links, pool=None, workers=DETAIL_WORKERS):
+    return list(iter_details(links, pool, workers))
+
+def scrape_details(pool=None, input_file=INPUT_FILE, sink=None, fetcher=None, workers=DETAIL_WORKERS):
+    """Batch mode: links from `input_file` into `sink` (default: a JSON array in OUTPUT_FILE)."""
+    try:
+        links = read_links(input_file)
+    except FileNotFoundError:
+        print(f"Error: {input_file} not found.")
+        return 0
 
-    
-    driver.quit()
-    return all_job_data
-
-
-
-
-
-
-
-
+    logging.info(f"Loaded links from {input_file}. Starting scrape...")
+    return sinks.drain(iter_details(links, pool, workers, fetcher=fetcher), sink or sinks.JsonFileSink(OUTPUT_FILE))
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Shomvob job detail pages")
+    parser.add_argument("--input", default=INPUT_FILE, help="JSON array, JSONL or one URL per line")
+    parser.add_argument("--sink", choices=sinks.SINK_KINDS, default="json")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="file for the json/jsonl sinks")
+    parser.add_argument("--fetcher", choices=sorted(FETCHERS), default="selenium")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="page cache of the http/cache fetchers")
+    parser.add_argument("--workers", type=int, default=DETAIL_WORKERS)
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    scrape_details()
\ No newline at end of file
+    args = parse_args()
+    scrape_details(
+        input_file=args.input,
+        sink=sinks.open_sink(args.sink, args.output),
+        fetcher=FETCHERS[args.fetcher](args),
+        workers=args.workers,
+    )
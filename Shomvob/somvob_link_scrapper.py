@@ -1,35 +1,95 @@
 #!/usr/bin/env python3
 import time
+import json
 import logging
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from html_parser import parse_html, first, text, text_parent
+import driver_pool
+import dedup
+import page_archive
+from metrics import METRICS
+from rate_limiter import get_limiter
+from urllib.parse import urlparse
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s", datefmt="%H:%M:%S")
 
 BASE_URL = "https://app.shomvob.co/all-jobs/"
+JOB_URL_TEMPLATE = "https://app.shomvob.co/single-job-description/?id={}"
+CARD_XPATH = "//div[contains(@class, 'hover:shadow-lg') and contains(@class, 'cursor-pointer')]"
+NEXT_BUTTON_XPATH = "//div[contains(@class, 'cursor-pointer')][.//div[text()='Next']]"
+DEADLINE_PATTERN = re.compile(r"Deadline", re.I)
 
-def setup_driver(headless=True):
-    opts = Options()
-    if headless:
-        opts.add_argument("--headless=new")
-    
-    opts.add_argument("--start-maximized")
-    opts.add_argument("--disable-blink-features=AutomationControlled")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=opts)
-    return driver
+# --- Readiness waits (replace the old fixed 60s warm-up / 4s per-page sleeps) ---
+WARMUP_TIMEOUT = 90      # Max wait for the first page of cards after opening the site
+PAGE_TIMEOUT = 20        # Max wait for the next page of cards after clicking "Next"
+POLL_INTERVAL = 0.5      # Seconds between readiness checks
+STABLE_POLLS = 2         # Card count must stay unchanged for this many polls in a row
+
+# Card count plus a signature of the first card, so a page change can be told
+# apart from the old page still being on screen.
+CARD_STATE_SCRIPT = """
+const snapshot = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const first = snapshot.snapshotLength ? snapshot.snapshotItem(0).textContent : null;
+return {count: snapshot.snapshotLength, first: first};
+"""
+
+# Collects every card of the current listing page in one round trip: its
+# outerHTML, a usable <a href> if there is one, and otherwise the job id held
+# in the framework state attached to the DOM node (React props/fiber or
+# Angular context), so no card has to be ctrl-clicked open in a new tab.
+CARDS_SCRIPT = """
+const snapshot = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+
+function findJobId(value, depth) {
+    if (!value || typeof value !== 'object' || depth > 4) return null;
+    for (const key of ['job_id', 'jobId', 'id']) {
+        const v = value[key];
+        if (typeof v === 'number' || (typeof v === 'string' && /^\\d+$/.test(v))) return String(v);
+    }
+    for (const key of ['job', 'data', 'item', 'props', 'children']) {
+        const found = findJobId(value[key], depth + 1);
+        if (found) return found;
+    }
+    return null;
+}
+
+function stateJobId(el) {
+    for (const key of Object.keys(el)) {
+        if (key.startsWith('__reactProps')) {
+            const found = findJobId(el[key], 0);
+            if (found) return found;
+        }
+        if (key.startsWith('__reactFiber')) {
+            let fiber = el[key];
+            for (let level = 0; fiber && level < 10; level++, fiber = fiber.return) {
+                const found = findJobId(fiber.memoizedProps, 0);
+                if (found) return found;
+            }
+        }
+        if (key === '__ngContext__' && Array.isArray(el[key])) {
+            for (const entry of el[key]) {
+                const found = findJobId(entry, 0);
+                if (found) return found;
+            }
+        }
+    }
+    return null;
+}
+
+const cards = [];
+for (let i = 0; i < snapshot.snapshotLength; i++) {
+    const el = snapshot.snapshotItem(i);
+    const anchor = el.querySelector('a[href]');
+    cards.push({html: el.outerHTML, href: anchor ? anchor.href : null, job_id: stateJobId(el)});
+}
+return cards;
+"""
 
 def get_actual_url_via_click(driver, card_element):
     original_window = driver.current_window_handle
@@ -45,7 +105,7 @@ def get_actual_url_via_click(driver, card_element):
 
         
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", card_element)
-        time.sleep(0.5)
+        WebDriverWait(driver, 2, poll_frequency=0.1).until(EC.element_to_be_clickable(card_element))
 
         actions = ActionChains(driver)
         modifier_key = Keys.COMMAND if 'mac' in driver.capabilities['platformName'].lower() else Keys.CONTROL
@@ -71,93 +131,198 @@ def get_actual_url_via_click(driver, card_element):
         driver.switch_to.window(original_window)
         return "Error extracting link"
 
-def scrape_shomvob_pagination(max_pages=3, out_file="BRAC_Project/Job_Post_Scrapping/Shomvob/links.json"):
-   
-    driver = setup_driver(headless=True)
-    all_jobs = []
-    seen_urls = set()
+def wait_for_cards(driver, timeout, previous_first=None, label="page"):
+    """
+    Waits until the listing shows cards that differ from `previous_first` and
+    the card count has stopped changing. Records the wait in the metrics and
+    returns (first card's signature or None on timeout, seconds waited).
+    """
+    state = {'count': -1, 'first': None, 'stable': 0}
+
+    def cards_settled(d):
+        current = d.execute_script(CARD_STATE_SCRIPT, CARD_XPATH)
+        if not current['count'] or current['first'] == previous_first:
+            state.update(count=-1, first=None, stable=0)
+            return False
+        if current['count'] == state['count'] and current['first'] == state['first']:
+            state['stable'] += 1
+        else:
+            state.update(count=current['count'], first=current['first'], stable=0)
+        return state['stable'] >= STABLE_POLLS
 
+    start = time.monotonic()
     try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(cards_settled)
+        timed_out = False
+    except TimeoutException:
+        timed_out = True
+    elapsed = time.monotonic() - start
+
+    METRICS.observe("fetch_seconds", elapsed, source="shomvob_listing", fetcher="selenium")
+    if timed_out:
+        METRICS.inc("page_errors", source="shomvob_listing", fetcher="selenium")
+    else:
+        METRICS.inc("pages_fetched", source="shomvob_listing", fetcher="selenium")
+    logging.info(f"Waited {elapsed:.1f}s for {label} ({max(state['count'], 0)} cards, timed_out={timed_out})")
+    return (None if timed_out else state['first']), elapsed
+
+def resolve_card_url(card):
+    """Builds the job URL from the data CARDS_SCRIPT returned for one card, or None."""
+    href = card.get('href')
+    if href and "http" in href and "#" not in href:
+        return href
+    if card.get('job_id'):
+        return JOB_URL_TEMPLATE.format(card['job_id'])
+    return None
+
+def listing_page_url(page_num):
+    """Archive key of a listing page: the SPA keeps one URL while paging, so the page number is added."""
+    return f"{BASE_URL}?page={page_num}"
+
+class ArchivedCards:
+    """Stands in for the WebDriver in parse_listing_page during replay: returns the archived cards."""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def execute_script(self, script, *args):
+        return self.cards
+
+    def find_elements(self, *args):
+        return []
+
+def parse_listing_page(driver, page_num, cards=None):
+    """Reads all cards of the listing page currently on screen (or `cards`, already read from it) into job dicts."""
+    page_jobs = []
+    if cards is None:
+        cards = driver.execute_script(CARDS_SCRIPT, CARD_XPATH)
+    logging.info(f"Found {len(cards)} cards on page {page_num}")
+
+    card_elements = None
+    for i, card in enumerate(cards):
+        try:
+            tree = parse_html(card.get('html'))
+            
+            title_tag = first(tree.xpath("//*[contains(@class, 'font-bold')]")) if tree is not None else None
+            title = text(title_tag) if title_tag is not None else "No Title"
+            
+            deadline = "Not specified"
+            dl_node = next((node for node in tree.xpath("//text()") if DEADLINE_PATTERN.search(node)), None) if tree is not None else None
+            if dl_node is not None:
+                deadline = text(text_parent(dl_node)).replace("Deadline:", "").strip()
+
+            link = resolve_card_url(card)
+            if not link:
+                # Neither an href nor framework state: fall back to opening the card.
+                if card_elements is None:
+                    card_elements = driver.find_elements(By.XPATH, CARD_XPATH)
+                link = get_actual_url_via_click(driver, card_elements[i])
+            
+            if "Error" not in link:
+                page_jobs.append({
+                    "title": title,
+                    "deadline": deadline,
+                    "link": link,
+                    "page": page_num
+                })
+            
+        except Exception as e:
+            logging.error(f"Error parsing card {i}: {e}")
+            continue
+
+    return page_jobs
+
+def scrape_shomvob_pagination(max_pages=3, out_file="BRAC_Project/Job_Post_Scrapping/Shomvob/links.json", pool=None, journal=None, watermark=None):
+    """
+    Walks the listing (newest first) for up to `max_pages` pages. With a
+    `dedup.ListingWatermark` it stops at the first page that holds nothing new.
+    """
+    if page_archive.replaying():
+        return replay_pagination(max_pages, journal, watermark)
+
+    all_jobs = []
+    seen_keys = set()
+
+    limiter = get_limiter(urlparse(BASE_URL).netloc)
+    with driver_pool.borrowed(pool) as drivers, drivers.lease() as driver:
         logging.info(f"Navigating to {BASE_URL}")
         driver.get(BASE_URL)
-        time.sleep(60)
 
+        previous_first = None
         for page_num in range(1, max_pages + 1):
             logging.info(f"--- Processing Page {page_num}/{max_pages} ---")
             
-            
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.XPATH, "//div[contains(@class, 'hover:shadow-lg')]"))
-                )
-            except:
+            timeout = WARMUP_TIMEOUT if page_num == 1 else PAGE_TIMEOUT
+            previous_first, waited = wait_for_cards(driver, timeout, previous_first, label=f"page {page_num}")
+            # The first page includes the app's cold start, which says nothing about server load.
+            limiter.feedback(latency=waited if page_num > 1 else None, error=previous_first is None)
+            if previous_first is None:
                 logging.warning("No cards found. Stopping.")
                 break
 
-            
-            card_elements = driver.find_elements(By.XPATH, "//div[contains(@class, 'hover:shadow-lg') and contains(@class, 'cursor-pointer')]")
-            logging.info(f"Found {len(card_elements)} cards on page {page_num}")
+            if journal is not None and journal.is_done('shomvob_page', page_num):
+                page_jobs = journal.get('shomvob_page', page_num)
+                logging.info(f"Page {page_num} already in the run journal ({len(page_jobs)} jobs).")
+            else:
+                cards = driver.execute_script(CARDS_SCRIPT, CARD_XPATH)
+                page_archive.record(listing_page_url(page_num), json.dumps(cards, ensure_ascii=False), kind="cards")
+                with METRICS.timer("parse_seconds", source="shomvob_listing", fetcher="selenium"):
+                    page_jobs = parse_listing_page(driver, page_num, cards)
+                if journal is not None:
+                    journal.record('shomvob_page', page_num, page_jobs)
 
-            
-            for i, card in enumerate(card_elements):
+            for job_data in page_jobs:
+                link_key = dedup.canonical_job_key(job_data['link'])
+                if link_key not in seen_keys:
+                    all_jobs.append(job_data)
+                    seen_keys.add(link_key)
 
-                time.sleep(0.5) 
-                try:
-                    card_html = card.get_attribute('outerHTML')
-                    soup = BeautifulSoup(card_html, "html.parser")
-                    
-                    title_tag = soup.find(class_=re.compile(r"font-bold"))
-                    title = title_tag.get_text(strip=True) if title_tag else "No Title"
-                    
-                    deadline = "Not specified"
-                    dl_node = soup.find(string=re.compile(r"Deadline", re.I))
-                    if dl_node:
-                        deadline = dl_node.parent.get_text(strip=True).replace("Deadline:", "").strip()
-
-                    link = get_actual_url_via_click(driver, card)
-                    
-                    if link not in seen_urls and "Error" not in link:
-                        job_data = {
-                            "title": title,
-                            "deadline": deadline,
-                            "link": link,
-                            "page": page_num
-                        }
-                        all_jobs.append(job_data)
-                        seen_urls.add(link)
-                        #logging.info(f"Parsed: {title[:30]}... -> {link}")
-                    
-                except Exception as e:
-                    logging.error(f"Error parsing card {i}: {e}")
-                    continue
+            if watermark is not None and watermark.reached(page_jobs):
+                logging.info(f"Page {page_num} holds no new jobs; incremental crawl stops here.")
+                break
 
             #Handle Pagination 
             if page_num < max_pages:
                 try:
                     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(1)
-
-
-                    next_btn = driver.find_element(
-                        By.XPATH,
-                        "//div[contains(@class, 'cursor-pointer')][.//div[text()='Next']]"
+                    next_btn = WebDriverWait(driver, 5, poll_frequency=POLL_INTERVAL).until(
+                        EC.presence_of_element_located((By.XPATH, NEXT_BUTTON_XPATH))
                     )
 
+                    limiter.wait()
                     logging.info("Clicking Next Page...")
                     driver.execute_script("arguments[0].click();", next_btn)
-                    
-
-                    time.sleep(4)
                 except Exception as e:
                     logging.info(f"Next button not found or error: {e}")
                     break
             else:
                 logging.info(f"Reached limit of {max_pages} pages. Stopping.")
-
-    finally:
-        driver.quit()
     
     return all_jobs
 
+def replay_pagination(max_pages=3, journal=None, watermark=None):
+    """scrape_shomvob_pagination over the card lists of the page archive, without a browser."""
+    all_jobs = []
+    for page_num in range(1, max_pages + 1):
+        if journal is not None and journal.is_done('shomvob_page', page_num):
+            page_jobs = journal.get('shomvob_page', page_num)
+        else:
+            try:
+                cards = json.loads(page_archive.replay(listing_page_url(page_num), "cards"))
+            except page_archive.ReplayMiss as e:
+                logging.info(f"{e}; replayed listing ends here.")
+                break
+            page_jobs = parse_listing_page(ArchivedCards(cards), page_num)
+            if journal is not None:
+                journal.record('shomvob_page', page_num, page_jobs)
+
+        all_jobs.extend(page_jobs)
+        if watermark is not None and watermark.reached(page_jobs):
+            logging.info(f"Page {page_num} holds no new jobs; incremental crawl stops here.")
+            break
+
+    return dedup.dedupe_listing(all_jobs)
+
+# Imports project-root modules: run from the root as `python3 -m Shomvob.somvob_link_scrapper`.
 if __name__ == "__main__":
     scrape_shomvob_pagination(max_pages=3)
\ No newline at end of file
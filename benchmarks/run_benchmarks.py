@@ -0,0 +1,228 @@
+"""
+Offline benchmarks for the CPU-bound parts of the pipeline: listing and
+detail parsing, IT filtering, categorization and dedup. No network, no
+browser and no MongoDB are needed; inputs are the recorded JSON files of
+the repo plus the HTML snapshots in benchmarks/fixtures/.
+
+    python benchmarks/run_benchmarks.py                 # all cases
+    python benchmarks/run_benchmarks.py -k parse        # cases whose name contains "parse"
+    python benchmarks/run_benchmarks.py --json out.json # also write the results as JSON
+
+Compare the output of two commits to see what a change did to throughput
+and peak memory.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Parsing fixtures must never land in the real page archive.
+os.environ["PAGE_ARCHIVE"] = "off"
+
+# --- CONFIGURATION ---
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+SHOMVOB_LINKS = os.path.join(ROOT, "Shomvob", "links.json")
+BDJOBS_LINKS = os.path.join(ROOT, "BDJobs", "links.json")
+JOBS_FILE = os.path.join(ROOT, "jobs.json")
+REPEAT = 5          # Timed runs per case; the best one is reported
+DETAIL_PAGES = 50   # Detail pages parsed per run
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class _CardDriver:
+    """Stands in for the WebDriver in Shomvob's parse_listing_page: returns recorded cards."""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def execute_script(self, script, *args):
+        return self.cards
+
+
+# --- CASES ---
+# Each case returns (function, number of items it processes per run).
+
+def case_filter_it_jobs():
+    from Shomvob.somvob_filtering import filter_it_jobs_memory
+    jobs = load_json(SHOMVOB_LINKS)
+    return (lambda: filter_it_jobs_memory([dict(j) for j in jobs])), len(jobs)
+
+def case_assign_categories_cold():
+    import combined
+    titles = [job.get('title', '') for job in load_json(JOBS_FILE)]
+
+    def run():
+        combined._category_cache.clear()
+        combined.assign_categories(titles)
+    return run, len(titles)
+
+def case_assign_categories_warm():
+    import combined
+    titles = [job.get('title', '') for job in load_json(JOBS_FILE)]
+    combined.assign_categories(titles)
+    return (lambda: combined.assign_categories(titles)), len(titles)
+
+def case_bdjobs_listing_parse():
+    from BDJobs.bd_jobs_link_scrapper import parse_listing_page
+    page = load_fixture("bdjobs_listing.html").encode('utf-8')
+    cards = len(parse_listing_page(page))
+    return (lambda: parse_listing_page(page)), cards
+
+def case_bdjobs_detail_parse():
+    from BDJobs.bd_jobs_async_scrapper import parse_detail_html
+    page = load_fixture("bdjobs_detail.html")
+    links = load_json(BDJOBS_LINKS)[:DETAIL_PAGES]
+
+    def run():
+        for job in links:
+            parse_detail_html(page, job, job['link'])
+    return run, len(links)
+
+def case_shomvob_listing_parse():
+    from Shomvob import somvob_link_scrapper
+    card_html = load_fixture("shomvob_card.html")
+    cards = [{'html': card_html, 'href': None, 'job_id': str(i)} for i in range(20)]
+    driver = _CardDriver(cards)
+    return (lambda: somvob_link_scrapper.parse_listing_page(driver, 1)), len(cards)
+
+def case_shomvob_detail_parse():
+    from Shomvob.somvob_job_scrapper import parse_job_page
+    page = load_fixture("shomvob_detail.html")
+    links = load_json(SHOMVOB_LINKS)[:DETAIL_PAGES]
+
+    def run():
+        for job in links:
+            parse_job_page(page, job, job['link'])
+    return run, len(links)
+
+def case_shomvob_extract_cached():
+    from http_cache import CachedSession
+    from Shomvob.somvob_job_scrapper import HttpFetcher, extract
+    page = load_fixture("shomvob_detail.html")
+    links = load_json(SHOMVOB_LINKS)[:DETAIL_PAGES]
+    session = CachedSession(tempfile.mkdtemp(prefix="bench_cache_"), offline=True)
+    for job in links:
+        session.put(job['link'], page)
+    fetcher = HttpFetcher(session)
+    return (lambda: list(extract(links, fetcher))), len(links)
+
+def case_shomvob_grid_lookup():
+    from html_parser import parse_html
+    from Shomvob.somvob_job_scrapper import get_visual_grid_data
+    tree = parse_html(load_fixture("shomvob_detail.html"))
+    labels = ["Vacancy", "Experience", "Education", "Employment Type", "Location", "Deadline"]
+
+    def run():
+        for label in labels:
+            get_visual_grid_data(tree, label)
+    return run, len(labels)
+
+def case_clean_html_to_list():
+    from Shomvob.somvob_job_scrapper import clean_html_to_list
+    snippets = [
+        "<p>Plan campaigns.</p><ul><li>Run ads</li><li>Write posts</li><li>Report weekly</li></ul>",
+        "Handle customer calls<br>Keep records<br/>Escalate complaints</p>",
+    ] * 50
+    return (lambda: [clean_html_to_list(s) for s in snippets]), len(snippets)
+
+def case_canonical_job_key():
+    import dedup
+    urls = [j['link'] for j in load_json(SHOMVOB_LINKS) + load_json(BDJOBS_LINKS) if j.get('link')]
+    return (lambda: [dedup.canonical_job_key(u) for u in urls]), len(urls)
+
+def case_dedup_index_lookup():
+    import dedup
+    urls = [j['link'] for j in load_json(SHOMVOB_LINKS) + load_json(BDJOBS_LINKS) if j.get('link')]
+    keys = [dedup.canonical_job_key(u) for u in urls]
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_dedup_"), "index.sqlite3")
+    index = dedup.DedupIndex(path)
+    index.add(keys[::2])
+    return (lambda: dedup.find_known(index, None, urls)), len(urls)
+
+
+CASES = [
+    ("filter_it_jobs", case_filter_it_jobs),
+    ("assign_categories_cold", case_assign_categories_cold),
+    ("assign_categories_warm", case_assign_categories_warm),
+    ("bdjobs_listing_parse", case_bdjobs_listing_parse),
+    ("bdjobs_detail_parse", case_bdjobs_detail_parse),
+    ("shomvob_listing_parse", case_shomvob_listing_parse),
+    ("shomvob_detail_parse", case_shomvob_detail_parse),
+    ("shomvob_extract_cached", case_shomvob_extract_cached),
+    ("shomvob_grid_lookup", case_shomvob_grid_lookup),
+    ("clean_html_to_list", case_clean_html_to_list),
+    ("canonical_job_key", case_canonical_job_key),
+    ("dedup_index_lookup", case_dedup_index_lookup),
+]
+
+
+def measure(func, items, repeat=REPEAT):
+    """Best-of-`repeat` wall time plus the peak memory of one extra traced run."""
+    func()  # warm-up: imports, regex compilation, caches the case itself wants warm
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'items': items,
+        'best_ms': round(best * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'items_per_s': round(items / best, 1) if best > 0 else None,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    parser.add_argument("-k", dest="keyword", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)  # parsers log every record
+
+    results = {}
+    print(f"{'case':<26}{'items':>7}{'best ms':>11}{'mean ms':>11}{'items/s':>12}{'peak KiB':>11}")
+    for name, case in CASES:
+        if args.keyword not in name:
+            continue
+        try:
+            func, items = case()
+            result = measure(func, items, args.repeat)
+        except ImportError as e:
+            print(f"{name:<26}skipped (missing dependency: {e.name})")
+            continue
+        results[name] = result
+        print(f"{name:<26}{result['items']:>7}{result['best_ms']:>11}{result['mean_ms']:>11}"
+              f"{result['items_per_s']:>12}{result['peak_kib']:>11}")
+
+    if args.json_out:
+        from lxml import etree
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'lxml': etree.__version__, 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import json
-from thefuzz import process, fuzz
+from collections import OrderedDict
+from rapidfuzz import process, fuzz, utils
 
 CATEGORY_MAPPING = {
     "Software Engineering": [
@@ -43,33 +44,53 @@ CATEGORY_MAPPING = {
     ]
 }
 
-def assign_category(job_title):
+CATEGORY_THRESHOLD = 60         # Only assign if we are at least 60% sure
+UNCATEGORIZED = "Other / Uncategorized"
+CATEGORY_CACHE_SIZE = 10000     # Normalized titles remembered between calls
+MATCH_WORKERS = -1              # rapidfuzz threads per cdist call (-1 = all cores)
+
+# All keywords flattened into one list (in CATEGORY_MAPPING order) plus the
+# category each one belongs to, so a batch of titles is scored in one cdist call.
+_KEYWORDS = [utils.default_process(kw) for keywords in CATEGORY_MAPPING.values() for kw in keywords]
+_KEYWORD_CATEGORY = [category for category, keywords in CATEGORY_MAPPING.items() for _ in keywords]
+_category_cache = OrderedDict()
+
+def assign_categories(job_titles):
     """
-    Matches the job title against all keyword lists using fuzzy logic.
-    Returns the category name with the highest matching score.
+    Matches every title against all keyword lists in one batch.
+    Returns the best matching category name per title, in order.
+    Job titles repeat a lot, so results are memoized by normalized title (LRU).
     """
-    best_category = "Uncategorized"
-    highest_score = 0
-    
-   
-    clean_title = str(job_title).lower()
+    keys = [utils.default_process(str(title)) for title in job_titles]
+    found = {}
 
-    for category, keywords in CATEGORY_MAPPING.items():
+    for key in keys:
+        if key in _category_cache and key not in found:
+            _category_cache.move_to_end(key)
+            found[key] = _category_cache[key]
 
-        match = process.extractOne(clean_title, keywords, scorer=fuzz.token_set_ratio)
-        
-        if match:
-            score = match[1]
-            
-            if score > highest_score:
-                highest_score = score
-                best_category = category
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        scores = process.cdist(missing, _KEYWORDS, scorer=fuzz.token_set_ratio, workers=MATCH_WORKERS)
+        best = scores.argmax(axis=1)
+        for row, key in enumerate(missing):
+            if scores[row, best[row]] < CATEGORY_THRESHOLD:
+                found[key] = UNCATEGORIZED
+            else:
+                found[key] = _KEYWORD_CATEGORY[best[row]]
 
-    # Threshold: Only assign if we are at least 60% sure
-    if highest_score < 60:
-        return "Other / Uncategorized"
-        
-    return best_category
+            _category_cache[key] = found[key]
+            if len(_category_cache) > CATEGORY_CACHE_SIZE:
+                _category_cache.popitem(last=False)
+
+    return [found[key] for key in keys]
+
+def assign_category(job_title):
+    """
+    Matches the job title against all keyword lists using fuzzy logic.
+    Returns the category name with the highest matching score.
+    """
+    return assign_categories([job_title])[0]
 
 def run_pipeline():
     
@@ -89,12 +110,9 @@ def run_pipeline():
     
     processed_data = []
     
-    for job in combined_jobs:
-
-        title = job.get('title', '') or job.get('job_title', '') 
-        
-        category = assign_category(title)
-        
+    titles = [job.get('title', '') or job.get('job_title', '') for job in combined_jobs]
+    
+    for job, category in zip(combined_jobs, assign_categories(titles)):
         job['category'] = category
         processed_data.append(job)
         
@@ -0,0 +1,357 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs, urlencode
+
+# --- CONFIGURATION ---
+DEDUP_DB_FILE = "dedup_index.sqlite3"   # Local index of everything already saved
+QUERY_CHUNK = 500                       # Keys per IN (...) / $in query
+STOP_AFTER_KNOWN = 20                   # Incremental listing crawls stop after this many known cards in a row
+REFRESH_TTL = 14 * 24 * 3600            # Re-fetch a stored job's detail page at least this often
+
+
+def canonical_job_key(url):
+    """
+    Stable key for a job posting, independent of tracking/listing query params:
+    'bdjobs:<id>' for BDJobs, 'shomvob:<id or slug>' for Shomvob, and the
+    normalized URL for anything else. Returns None for empty input.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    query = {k.lower(): v for k, v in parse_qs(parsed.query).items()}
+
+    if host.endswith("bdjobs.com") and query.get("id"):
+        return f"bdjobs:{query['id'][0].strip()}"
+    if host.endswith("shomvob.co"):
+        if query.get("id"):
+            return f"shomvob:{query['id'][0].strip()}"
+        slug = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+        if slug:
+            return f"shomvob:{slug}"
+    return f"url:{canonical_url(url)}"
+
+def canonical_url(url):
+    """One URL per job: BDJobs and Shomvob links are reduced to their job id."""
+    if not url:
+        return url
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    query = {k.lower(): v for k, v in parse_qs(parsed.query).items()}
+
+    if host.endswith("bdjobs.com") and query.get("id"):
+        return f"https://jobs.bdjobs.com/jobdetails/?id={query['id'][0].strip()}"
+    if host.endswith("shomvob.co") and query.get("id"):
+        return f"https://app.shomvob.co/single-job-description/?id={query['id'][0].strip()}"
+
+    sorted_query = urlencode(sorted(parse_qs(parsed.query).items()), doseq=True)
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=host, query=sorted_query, fragment="").geturl()
+
+def dedupe_listing(jobs):
+    """Drops listing entries that point at a job already seen earlier in the list."""
+    seen = set()
+    unique = []
+    for job in jobs:
+        key = canonical_job_key(job.get('link') or job.get('url'))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(job)
+    return unique
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:16]
+
+def listing_fingerprint(job):
+    """Hash of what a listing card shows about a job (title + deadline); a change means the posting was edited."""
+    return _hash([(job.get('title') or "").strip(), (job.get('deadline') or "").strip()])
+
+def field_hashes(record):
+    """One short hash per field of a detail record, to find which fields changed since the last save."""
+    return {field: _hash(value) for field, value in record.items() if not field.startswith('_')}
+
+
+def _chunks(items, size=QUERY_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class DedupIndex:
+    """
+    Local persistent set of canonical job keys that are already in MongoDB.
+    Updated after every save, so a run only has to ask Mongo about
+    candidates this index has never seen. WAL lets the source worker
+    processes and the writer use it at once.
+    """
+
+    def __init__(self, path=DEDUP_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_jobs (job_key TEXT PRIMARY KEY, added_at REAL)")
+        # Every job a finished crawl saw on a listing page, saved or not (e.g. filtered out as non-IT).
+        self._conn.execute("CREATE TABLE IF NOT EXISTS listed_jobs (job_key TEXT PRIMARY KEY, added_at REAL)")
+        # Per saved job: listing card hash, per-field hashes of the saved record, last detail fetch.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (job_key TEXT PRIMARY KEY, listing_hash TEXT, field_hashes TEXT, fetched_at REAL)"
+        )
+        self._conn.commit()
+
+    def _select(self, table, keys):
+        keys = list(dict.fromkeys(k for k in keys if k))
+        found = set()
+        with self._lock:
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT job_key FROM {table} WHERE job_key IN ({placeholders})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def _insert(self, table, keys):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {table} (job_key, added_at) VALUES (?, ?)",
+                [(k, now) for k in set(keys) if k],
+            )
+            self._conn.commit()
+
+    def known(self, keys):
+        """Returns the subset of `keys` present in the index."""
+        return self._select("seen_jobs", keys)
+
+    def add(self, keys):
+        self._insert("seen_jobs", keys)
+
+    def listed(self, keys):
+        """Returns the subset of `keys` a completed listing crawl has already seen."""
+        return self._select("listed_jobs", keys)
+
+    def mark_listed(self, keys):
+        self._insert("listed_jobs", keys)
+
+    def fingerprints(self, keys):
+        """{job_key: {'listing_hash', 'fields', 'fetched_at'}} for the keys that have one."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        found = {}
+        with self._lock:
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT job_key, listing_hash, field_hashes, fetched_at FROM fingerprints WHERE job_key IN ({placeholders})", chunk
+                )
+                for key, listing_hash, fields, fetched_at in rows:
+                    found[key] = {'listing_hash': listing_hash, 'fields': json.loads(fields) if fields else None, 'fetched_at': fetched_at}
+        return found
+
+    def set_fingerprints(self, rows):
+        """`rows`: (job_key, listing_hash, field_hashes or None, fetched_at); a None keeps the stored value."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO fingerprints (job_key, listing_hash, field_hashes, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_key) DO UPDATE SET "
+                "listing_hash = COALESCE(excluded.listing_hash, listing_hash), "
+                "field_hashes = COALESCE(excluded.field_hashes, field_hashes), "
+                "fetched_at = excluded.fetched_at",
+                [(key, listing_hash, json.dumps(fields) if fields is not None else None, fetched_at)
+                 for key, listing_hash, fields, fetched_at in rows if key],
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def plan_detail_fetches(index, jobs, stored_keys, ttl=REFRESH_TTL):
+    """
+    Picks the listing entries whose detail page has to be fetched: every
+    job not stored yet, plus stored jobs whose listing card changed (title
+    or deadline edited) or whose last fetch is older than `ttl`. Each
+    returned job carries its listing fingerprint as `_listing_hash`.
+    Stored jobs saved before fingerprints existed get one now, without a re-fetch.
+    """
+    now = time.time()
+    keys = [canonical_job_key(job.get('link') or job.get('url')) for job in jobs]
+    stored_fingerprints = index.fingerprints(k for k in keys if k in stored_keys)
+
+    to_fetch, seeded = [], []
+    new = changed = expired = 0
+    for job, key in zip(jobs, keys):
+        job['_listing_hash'] = listing_fingerprint(job)
+        if key not in stored_keys:
+            new += 1
+            to_fetch.append(job)
+            continue
+
+        stored = stored_fingerprints.get(key)
+        if stored is None:
+            seeded.append((key, job['_listing_hash'], None, now))
+        elif stored['listing_hash'] != job['_listing_hash']:
+            changed += 1
+            to_fetch.append(job)
+        elif now - (stored['fetched_at'] or 0) > ttl:
+            expired += 1
+            to_fetch.append(job)
+
+    if seeded:
+        index.set_fingerprints(seeded)
+    logging.info(f"Refresh plan: {new} new, {changed} changed on the listing, {expired} past the refresh TTL, "
+                 f"{len(jobs) - len(to_fetch)} skipped.")
+    return to_fetch
+
+
+class ListingWatermark:
+    """
+    Stop signal for incremental listing crawls, which scan pages newest
+    first. `is_known(urls)` returns the canonical keys among `urls` that
+    are already stored or listed; the crawl should stop once a whole page,
+    or `stop_after` cards in a row (across pages), are known.
+    """
+
+    def __init__(self, is_known, stop_after=STOP_AFTER_KNOWN):
+        self.is_known = is_known
+        self.stop_after = stop_after
+        self.streak = 0
+
+    def reached(self, jobs):
+        """Feeds one page of listing entries; True when the crawl has caught up with known jobs."""
+        urls = [job.get('link') or job.get('url') for job in jobs]
+        urls = [url for url in urls if url]
+        if not urls:
+            return False
+
+        known = self.is_known(urls)
+        page_known = 0
+        for url in urls:
+            if canonical_job_key(url) in known:
+                self.streak += 1
+                page_known += 1
+            else:
+                self.streak = 0
+        return page_known == len(urls) or self.streak >= self.stop_after
+
+
+def migrate_legacy_documents(collection):
+    """
+    Gives documents stored before canonical keys existed their `job_key` and
+    canonical `url`, so the pipeline's upserts on `job_key` update them
+    instead of inserting a duplicate. Older documents of the same job are
+    grouped by key: the oldest one (or the document already holding the key)
+    keeps it, the others get `duplicate_of: <its _id>` and their `url` moved
+    to `duplicate_url`, so the unique indexes can be built.
+    Returns (migrated, marked as duplicates).
+    """
+    from pymongo import UpdateOne
+
+    groups = {}
+    legacy = {"job_key": {"$exists": False}, "duplicate_of": {"$exists": False}}
+    for doc in collection.find(legacy, {"_id": 1, "url": 1, "link": 1}).sort("_id", 1):
+        url = doc.get("url") or doc.get("link")
+        key = canonical_job_key(url)
+        if key:
+            groups.setdefault(key, []).append((doc["_id"], url))
+
+    owners = {}
+    for chunk in _chunks(list(groups)):
+        for doc in collection.find({"job_key": {"$in": chunk}}, {"_id": 1, "job_key": 1}):
+            owners[doc["job_key"]] = doc["_id"]
+
+    operations = []
+    migrated = duplicates = 0
+    for key, docs in groups.items():
+        keeper = owners.get(key)
+        if keeper is None:
+            keeper, url = docs[0]
+            docs = docs[1:]
+            operations.append(UpdateOne({"_id": keeper}, {"$set": {"job_key": key, "url": canonical_url(url)}}))
+            migrated += 1
+        for doc_id, _ in docs:
+            operations.append(UpdateOne({"_id": doc_id}, {"$set": {"duplicate_of": keeper}, "$rename": {"url": "duplicate_url"}}))
+            duplicates += 1
+
+    for chunk in _chunks(operations):
+        collection.bulk_write(chunk, ordered=False)
+    if operations:
+        logging.info(f"Migrated {migrated} older Mongo documents to canonical job_key/url; "
+                     f"marked {duplicates} duplicates with duplicate_of.")
+    return migrated, duplicates
+
+def ensure_indexes(collection):
+    """
+    Unique indexes on `job_key` and `url` (plus a lookup index on the legacy
+    `link` field). Until the `job_key` index exists, older documents are
+    migrated first (see migrate_legacy_documents). Raises RuntimeError when
+    a unique index cannot be built: upserts on `job_key` are only safe with it.
+    """
+    if "job_key_1" not in collection.index_information():
+        migrate_legacy_documents(collection)
+    for field in ("job_key", "url"):
+        try:
+            collection.create_index(field, unique=True, partialFilterExpression={field: {"$type": "string"}})
+        except Exception as e:
+            raise RuntimeError(f"Could not create unique Mongo index on {field}: {e}") from e
+    try:
+        collection.create_index("link", sparse=True)
+    except Exception as e:
+        logging.warning(f"Could not create Mongo index on link: {e}")
+
+def existing_in_collection(collection, urls):
+    """
+    Returns the canonical keys of `urls` already stored in Mongo, matched by
+    `job_key`, or by raw/canonical `url` and legacy `link` for older documents.
+    """
+    key_of = {}
+    for url in urls:
+        key = canonical_job_key(url)
+        if key:
+            key_of[url] = key
+            key_of[canonical_url(url)] = key
+
+    keys = list(dict.fromkeys(key_of.values()))
+    found = set()
+    for chunk in _chunks(keys):
+        wanted = set(chunk)
+        chunk_urls = [u for u, k in key_of.items() if k in wanted]
+        cursor = collection.find(
+            {"$or": [{"job_key": {"$in": chunk}}, {"url": {"$in": chunk_urls}}, {"link": {"$in": chunk_urls}}]},
+            {"_id": 0, "job_key": 1, "url": 1, "link": 1},
+        )
+        for doc in cursor:
+            for key in (doc.get("job_key"), canonical_job_key(doc.get("url")), canonical_job_key(doc.get("link"))):
+                if key in wanted:
+                    found.add(key)
+    return found
+
+def find_known(index, collection, urls):
+    """
+    Checks this run's candidate URLs by canonical job key: local index
+    first, then one bulk `$in` query to Mongo for the misses. Keys Mongo
+    knows about are written back to the local index.
+    Returns the set of known keys.
+    """
+    keys_by_url = {u: canonical_job_key(u) for u in dict.fromkeys(urls) if u}
+    known = index.known(keys_by_url.values())
+    unknown_urls = [u for u, k in keys_by_url.items() if k not in known]
+
+    if unknown_urls and collection is not None:
+        in_db = existing_in_collection(collection, unknown_urls)
+        if in_db:
+            index.add(in_db)
+        known |= in_db
+
+    if collection is None:
+        lookup = "no Mongo lookup, local index only"
+    else:
+        lookup = f"{len(unknown_urls)} checked in Mongo"
+    logging.info(f"Dedup: {len(known)} of {len(set(keys_by_url.values()))} candidates already stored ({lookup}).")
+    return known
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service as ChromeService
+from webdriver_manager.chrome import ChromeDriverManager
+from metrics import METRICS
+
+# --- CONFIGURATION ---
+DRIVER_PATH_CACHE = ".chromedriver_path.json"  # Resolved chromedriver path, reused across runs
+DRIVER_PATH_TTL = 7 * 24 * 3600                # Re-resolve "LATEST" once a week
+POOL_SIZE = 2                                  # Warm browsers per pipeline run
+MAX_PAGES_PER_DRIVER = 50                      # Recycle a browser after this many leases
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+
+_driver_path_lock = threading.Lock()
+
+
+def get_chromedriver_path():
+    """
+    Returns the chromedriver binary path. webdriver-manager hits the network
+    for the LATEST version on every install(), so the resolved path is cached
+    on disk and only re-resolved when it is missing or older than the TTL.
+    """
+    with _driver_path_lock:
+        try:
+            with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if os.path.exists(cached['path']) and time.time() - cached['resolved_at'] < DRIVER_PATH_TTL:
+                return cached['path']
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+        path = ChromeDriverManager().install()
+        with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+        return path
+
+def build_options(headless=True):
+    opts = Options()
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--window-size=1920,1080")
+    opts.add_argument("--log-level=3")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--disable-blink-features=AutomationControlled")
+    opts.add_argument(f"user-agent={USER_AGENT}")
+    return opts
+
+def create_driver(headless=True):
+    service = ChromeService(executable_path=get_chromedriver_path())
+    return webdriver.Chrome(service=service, options=build_options(headless))
+
+
+class DriverPool:
+    """
+    A fixed set of warm headless Chrome instances shared by all stages of a run.
+    Stages take a driver with `lease()` (one lease per page) and give it back
+    when done; a driver is recycled after `max_pages` leases or when it crashed.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES_PER_DRIVER, headless=True):
+        self.size = size
+        self.max_pages = max_pages
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()  # Only one thread fills (or refills) the pool
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return self
+        with self._start_lock:
+            if not self._started:
+                logging.info(f"Starting driver pool with {self.size} browsers...")
+                for _ in range(self.size):
+                    self._add_driver()
+                self._started = True
+        return self
+
+    def _has_drivers(self):
+        with self._lock:
+            return bool(self._pages)
+
+    def _add_driver(self):
+        with METRICS.timer("driver_start_seconds"):
+            driver = create_driver(self.headless)
+        METRICS.inc("drivers_started")
+        with self._lock:
+            self._pages[id(driver)] = 0
+        self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.current_window_handle
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def lease(self):
+        """Borrows a driver for one unit of work (a page, or a whole pagination session)."""
+        self.start()
+        if not self._has_drivers():
+            with self._start_lock:
+                if not self._has_drivers():
+                    # Every replacement failed so far; try once more instead of blocking forever.
+                    self._add_driver()
+
+        driver = self._idle.get()
+        try:
+            yield driver
+        finally:
+            with self._lock:
+                self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+                used = self._pages[id(driver)]
+
+            crashed = not self._is_alive(driver)
+            if crashed or used >= self.max_pages:
+                logging.info(f"Recycling browser after {used} pages (crashed={crashed}).")
+                METRICS.inc("driver_restarts", reason="crashed" if crashed else "max_pages")
+                self._discard(driver)
+                try:
+                    self._add_driver()
+                except Exception as e:
+                    logging.error(f"Could not replace browser: {e}")
+            else:
+                self._idle.put(driver)
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        self._started = False
+
+
+@contextmanager
+def borrowed(pool=None, size=1):
+    """Yields `pool` as-is, or a temporary pool of `size` browsers closed on exit."""
+    if pool is not None:
+        yield pool
+        return
+
+    temp_pool = DriverPool(size=size)
+    try:
+        yield temp_pool
+    finally:
+        temp_pool.close()
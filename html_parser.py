@@ -0,0 +1,60 @@
+import threading
+from itertools import chain
+from lxml import html as lxml_html
+
+# Every scraper parses with lxml.html and queries the tree with XPath
+# (bd_jobs_async_scrapper.parse_detail_html does the same). The text
+# helpers follow BeautifulSoup's get_text() rules, which the extractors were
+# written against: script, style and comment text is never part of an element's text.
+
+_local = threading.local()
+
+
+def _parser():
+    # One parser per thread; markup is always handed over as UTF-8 bytes, so
+    # a page's own charset meta or XML declaration cannot mis-decode it.
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = lxml_html.HTMLParser(encoding='utf-8')
+    return parser
+
+def parse_html(markup):
+    """Document tree of a page or fragment (str or bytes), or None when there is nothing to parse."""
+    if isinstance(markup, bytes):
+        markup = markup.decode('utf-8', errors='replace')
+    if not markup or not markup.strip():
+        return None
+    return lxml_html.document_fromstring(markup.encode('utf-8'), parser=_parser())
+
+def has_class(name):
+    """XPath predicate body: the element's class list contains `name` (CSS `.name`)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def first(elements):
+    return elements[0] if elements else None
+
+def strings(element):
+    """The text nodes under `element`, in document order, without script/style text."""
+    return element.xpath(".//text()[not(parent::script or parent::style)]")
+
+def text(element):
+    """Stripped text pieces joined without a separator, like get_text(strip=True)."""
+    return "".join(part.strip() for part in strings(element))
+
+def text_parent(node):
+    """The element a text node returned by XPath belongs to (lxml reports a tail under its left sibling)."""
+    parent = node.getparent()
+    return parent.getparent() if node.is_tail else parent
+
+def self_and_ancestors(element, tag=None):
+    """`element` and its ancestors, nearest first, optionally only those named `tag`."""
+    nodes = chain([element], element.iterancestors())
+    return (node for node in nodes if node.tag == tag) if tag else nodes
+
+def next_sibling(element, tag):
+    """First following sibling element named `tag`, or None."""
+    return next(element.itersiblings(tag), None)
+
+def to_html(element):
+    """Markup of `element` without its tail text."""
+    return lxml_html.tostring(element, encoding='unicode', with_tail=False)
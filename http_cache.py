@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import METRICS
+from rate_limiter import get_limiter
+import page_archive
+
+# --- CONFIGURATION ---
+CACHE_DIR = ".http_cache"          # One <sha1(url)>.json (meta) + .body file per URL
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 1.0               # 1s, 2s, 4s between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 4
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class CachedResponse:
+    """What CachedSession.get() returns: the body plus whether it changed since last time."""
+
+    def __init__(self, url, content, status_code, content_hash, changed, from_cache):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.content_hash = content_hash
+        self.changed = changed
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class CachedSession:
+    """
+    Pooled keep-alive requests.Session with retries/backoff, the adaptive
+    per-host rate limiter and a persistent on-disk cache. Requests are revalidated with ETag / Last-Modified; a 304
+    or a body whose hash did not change comes back with `changed=False`, and
+    callers can store the parse result of a page next to it (set_parsed /
+    get_parsed) so unchanged pages are not parsed again.
+
+    With `offline=True` nothing is sent over the network: every URL is served
+    from `cache_dir`, which makes a directory of recorded pages usable as
+    test fixtures. Fetched pages also go to the page archive, which serves
+    them instead of the network in replay mode.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, offline=False, headers=HEADERS):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=("GET", "HEAD"),
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _path(self, url, suffix):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + suffix)
+
+    def _load_meta(self, url):
+        try:
+            with open(self._path(url, ".json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _load_body(self, url):
+        with open(self._path(url, ".body"), 'rb') as f:
+            return f.read()
+
+    def _store(self, url, content, content_hash, etag=None, last_modified=None):
+        with open(self._path(url, ".body"), 'wb') as f:
+            f.write(content)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+        }
+        with open(self._path(url, ".json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def put(self, url, content):
+        """Records `content` (bytes or str) as the cached copy of `url`, e.g. to build offline fixtures."""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self._store(url, content, hashlib.sha256(content).hexdigest())
+
+    def get(self, url, timeout=15):
+        if page_archive.replaying():
+            content = page_archive.replay(url)
+            return CachedResponse(url, content, 200, hashlib.sha256(content).hexdigest(), True, True)
+
+        meta = self._load_meta(url)
+
+        if self.offline:
+            if meta is None:
+                raise FileNotFoundError(f"No cached copy of {url} in {self.cache_dir}")
+            return CachedResponse(url, self._load_body(url), 200, meta['content_hash'], False, True)
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        host = urlparse(url).netloc
+        limiter = get_limiter(host)
+        with METRICS.timer("rate_limit_wait_seconds", source=host):
+            limiter.wait()
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=timeout, headers=headers)
+        except requests.exceptions.RequestException:
+            limiter.feedback(error=True)
+            raise
+        latency = time.perf_counter() - start
+        limiter.feedback(status=response.status_code, latency=latency)
+        METRICS.observe("fetch_seconds", latency, source=host, fetcher="http")
+        METRICS.inc("pages_fetched", source=host, fetcher="http")
+        METRICS.inc("bytes_fetched", len(response.content), source=host)
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', ())
+        if retries:
+            METRICS.inc("retries", len(retries), source=host)
+
+        if response.status_code == 304 and meta:
+            METRICS.inc("cache_not_modified", source=host)
+            logging.info(f"HTTP cache: {url} not modified (304).")
+            content = self._load_body(url)
+            page_archive.record(url, content, status=304)
+            return CachedResponse(url, content, 304, meta['content_hash'], False, True)
+
+        response.raise_for_status()
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        changed = meta is None or meta.get('content_hash') != content_hash
+        self._store(url, response.content, content_hash, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        page_archive.record(url, response.content, status=response.status_code)
+        return CachedResponse(url, response.content, response.status_code, content_hash, changed, False)
+
+    def get_parsed(self, response):
+        """Parse result stored for exactly this body, or None."""
+        try:
+            with open(self._path(response.url, ".parsed.json"), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if stored.get('content_hash') != response.content_hash:
+            return None
+        return stored['parsed']
+
+    def set_parsed(self, response, parsed):
+        with open(self._path(response.url, ".parsed.json"), 'w', encoding='utf-8') as f:
+            json.dump({'content_hash': response.content_hash, 'parsed': parsed}, f, ensure_ascii=False)
+
+    def close(self):
+        self.session.close()
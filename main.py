@@ -1,36 +1,50 @@
-import time
 import json
-import random
+import argparse
 import logging
 import os
-from datetime import datetime, timedelta
-from BDJobs import bd_jobs_job_scrapper
+import queue
+import signal
+import multiprocessing
+from datetime import datetime
+from BDJobs import bd_jobs_async_scrapper
 from BDJobs import bd_jobs_link_scrapper
 from Shomvob import somvob_filtering
 from Shomvob import somvob_link_scrapper
 from Shomvob import somvob_job_scrapper
-import combined
-from dotenv import load_dotenv
-from pymongo import MongoClient
+import driver_pool
+import dedup
+import sinks
+import page_archive
+import run_journal
+import scheduler
+import metrics
+from metrics import METRICS
+from mongo_store import MONGO, JobWriter, get_mongo_collection
 
 # --- CONFIGURATION ---
 LOG_FILE = "service_log.txt"
-START_HOUR = 1  # 1 AM
-END_HOUR = 5    # 5 AM 
-
-load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    print("Error: MONGO_URI not found in .env file!")
-else:
-    print("Successfully loaded Mongo URI.")
-DB_NAME = "test"
-COLLECTION_NAME = "jobs"
+SOURCES = ("shomvob", "bdjobs")
+SCHEDULES = {                           # source: (cron "minute hour day month weekday", jitter minutes)
+    "bdjobs": ("0 */2 * * *", 20),      # every 2 hours
+    "shomvob": ("0 1 * * *", 240),      # nightly, somewhere between 01:00 and 05:00
+}
+RUN_ON_START = True                     # Run every source once right after startup
+SHOMVOB_MAX_PAGES = 10                  # Incremental crawl cap; the listing watermark usually stops it earlier
+SHOMVOB_BACKFILL_PAGES = 60             # `--backfill`: full-depth crawl, no watermark
+DRIVER_POOL_SIZE = 4  # Warm Chrome instances shared by all stages (= parallel Shomvob detail workers)
+PARALLEL_SOURCES = True     # Crawl each source in its own worker process when a run covers several
+SOURCE_POOL_SIZES = {       # Browsers per source worker (BDJobs only needs them for JavaScript-only pages)
+    "shomvob": DRIVER_POOL_SIZE,
+    "bdjobs": 1,
+}
+REPLAY_OUTPUT = "replay_jobs.jsonl"                 # `--replay`: saved records go here instead of MongoDB
+REPLAY_INDEX_FILE = "dedup_index.replay.sqlite3"    # `--replay`: fresh dedup index, so every archived job counts as new
+REPLAY_JOURNAL_FILE = "run_journal.replay.jsonl"
 
 # Setup Logging
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+    format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s",
     handlers=[
         logging.FileHandler(LOG_FILE),
         logging.StreamHandler()
@@ -38,163 +52,347 @@ logging.basicConfig(
     force=True  
 )
 
-def get_mongo_collection():
-    """Establishes connection and returns the collection."""
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    return db[COLLECTION_NAME]
-
-def get_existing_urls():
+def get_existing_keys(index, candidate_urls):
     """
-    Fetches links from MongoDB to check for duplicates.
+    Returns the canonical job keys of this run's candidates that are already stored.
+    Uses the local dedup index and one bulk $in query for its misses,
+    so the cost depends on the run size, not on the collection size.
     """
     try:
-        collection = get_mongo_collection()
-        
-        urls = set(collection.distinct("url"))
-        
-        
-        links = set(collection.distinct("link"))
-        
-        
-        all_known = urls.union(links)
-        
-        
-        all_known.discard(None)
-        
-        logging.info(f"Database check: Found {len(all_known)} unique existing URLs.")
-        return all_known
+        collection = None if page_archive.replaying() else get_mongo_collection()
+        return dedup.find_known(index, collection, candidate_urls)
     except Exception as e:
         logging.error(f"Database Error: {e}")
-        return set()
+        return index.known(dedup.canonical_job_key(u) for u in candidate_urls)
 
-def save_to_database(new_jobs):
-    """Inserts new jobs directly into MongoDB."""
-    if not new_jobs:
-        return
+def run_pipeline(sources=SOURCES, backfill=False):
+    """
+    One run over `sources`. Listing crawls are incremental (they stop at
+    the first page without new jobs) unless `backfill` is set.
+    """
+    sources = [source for source in SOURCES if source in sources]
+    replay = page_archive.replaying()
+    logging.info(f"Starting Scraping Pipeline ({', '.join(sources)}{', backfill' if backfill else ''}{', replay' if replay else ''})...")
+    METRICS.reset()
+
+    if replay:
+        journals, index, writer = open_replay_run()
+    else:
+        page_archive.prune()
+        if MONGO.health_check():
+            dedup.ensure_indexes(get_mongo_collection())
+        else:
+            logging.error("Database Error: MongoDB is unreachable; dedup falls back to the local index.")
 
+        # A journal per source: whichever run next includes a crashed source resumes it.
+        journals = {source: run_journal.RunJournal.open(run_journal.journal_file(source)) for source in sources}
+        index = dedup.DedupIndex()
+        writer = JobWriter(index, journals)
+    failed = {}
     try:
-        collection = get_mongo_collection()
-        collection.insert_many(new_jobs)
-        logging.info(f"Successfully saved {len(new_jobs)} new jobs to MongoDB.")
+        with METRICS.stage("total"):
+            # Replays run inline: one process and a fixed source order keep the output deterministic.
+            if PARALLEL_SOURCES and len(sources) > 1 and not replay:
+                failed = run_source_processes(sources, journals, writer, backfill)
+            else:
+                run_sources_inline(sources, index, writer, journals, backfill)
+    finally:
+        # Whatever was scraped before a crash still gets saved.
+        writer.close()
+        index.close()
+        METRICS.log_stages()
+        METRICS.write_summary()
+
+    if writer.saved:
+        logging.info(f"Saved {writer.saved} new or updated jobs this run.")
+    else:
+        logging.info("No new jobs found this run.")
+
+    # Journals of failed sources stay open: the next run of those sources resumes them.
+    for journal in {journals[source] for source in sources if source not in failed}:
+        journal.complete()
+    if failed:
+        raise scheduler.SourcesFailed(failed)
+    logging.info("Pipeline Completed.")
+
+def open_replay_run():
+    """
+    Journals, dedup index and writer of a `--replay` run: all start empty
+    (every archived job is new), and records go to REPLAY_OUTPUT, not MongoDB.
+    All sources share one journal, which the next replay deletes anyway.
+    """
+    for path in (REPLAY_OUTPUT, REPLAY_INDEX_FILE, REPLAY_JOURNAL_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+    journal = run_journal.RunJournal.open(REPLAY_JOURNAL_FILE)
+    journals = {source: journal for source in SOURCES}
+    index = dedup.DedupIndex(REPLAY_INDEX_FILE)
+    return journals, index, JobWriter(index, journals, sink=sinks.JsonlSink(REPLAY_OUTPUT))
+
+def run_sources_inline(sources, index, writer, journals, backfill=False):
+    """
+    All sources one after another in this process, sharing one driver pool
+    sized for the hungriest source. Browsers start on the first lease, so a
+    run that never needs one (a replay, BDJobs without JavaScript-only pages)
+    starts none. The pool fills once even when that first lease comes from
+    several detail workers at once (a resumed run without a pagination lease).
+    """
+    pool = driver_pool.DriverPool(size=max(SOURCE_POOL_SIZES.get(source, DRIVER_POOL_SIZE) for source in sources))
+    try:
+        run_stages(pool, index, writer, journals, sources, backfill)
+    finally:
+        pool.close()
+
+class QueueWriter:
+    """JobWriter stand-in inside a source worker: hands every record to the parent."""
+
+    def __init__(self, source, events):
+        self.source = source
+        self.events = events
+
+    def add(self, job):
+        self.events.put(("job", self.source, job))
+
+def source_worker(source, journal_units, events, backfill=False):
+    """
+    Entry point of a source worker process: crawls one source with its own
+    browsers, rate limiters, Mongo client and dedup index connection, and
+    streams journal entries and scraped records back over `events`.
+    Always ends with a ("done", source, {"error", "metrics"}) event.
+    """
+    METRICS.reset()
+    journal = run_journal.ForwardingJournal(
+        journal_units, lambda stage, unit, data: events.put(("journal", source, (stage, unit, data)))
+    )
+    index = dedup.DedupIndex()
+    pool = driver_pool.DriverPool(size=SOURCE_POOL_SIZES.get(source, DRIVER_POOL_SIZE))
+    error = None
+    try:
+        SOURCE_STAGES[source](pool, index, QueueWriter(source, events), journal, backfill)
     except Exception as e:
-        logging.error(f"Failed to save to MongoDB: {e}")
+        logging.error(f"Source {source} failed: {e}")
+        error = str(e) or type(e).__name__
+    finally:
+        pool.close()
+        index.close()
+        MONGO.close()
+        events.put(("done", source, {'error': error, 'metrics': METRICS.summary()}))
 
-def run_pipeline():
-    logging.info("Starting Daily Scraping Pipeline...")
-    
-    
-    existing_urls = get_existing_urls()
-    
+def run_source_processes(sources, journals, writer, backfill=False):
+    """
+    Crawls every source in its own process (spawned, so no browser or
+    Mongo client state is inherited) while this process applies their
+    journal entries and feeds their records into the single `writer`.
+    A crashing source does not stop the others.
+    Returns {source: error} for the sources that failed.
+    """
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    workers = {
+        source: context.Process(target=source_worker, args=(source, journals[source].snapshot(), events, backfill), name=f"source-{source}")
+        for source in sources
+    }
+    for worker in workers.values():
+        worker.start()
+    logging.info(f"Started {len(workers)} source workers: {', '.join(sources)}")
+
+    results = {}
+    while len(results) < len(workers):
+        try:
+            kind, source, payload = events.get(timeout=1)
+        except queue.Empty:
+            for source, worker in workers.items():
+                if source not in results and not worker.is_alive():
+                    # Died without reporting back (segfault, OOM kill...).
+                    results[source] = f"worker exited with code {worker.exitcode}"
+            continue
+
+        if kind == "journal":
+            journals[source].record(*payload)
+        elif kind == "job":
+            writer.add(payload)
+        elif kind == "done":
+            METRICS.merge(payload['metrics'])
+            results[source] = payload['error']
+            logging.info(f"Source worker {source} finished{' with error: ' + payload['error'] if payload['error'] else ''}.")
+
+    for worker in workers.values():
+        worker.join()
+    return {source: error for source, error in results.items() if error}
+
+def stream_details(jobs, scrape, journal, writer):
+    """
+    Feeds detail records into `writer`. Jobs whose details are already in
+    the run journal (scraped before a crash) are not scraped again.
+    """
+    to_scrape = []
+    for job in jobs:
+        key = dedup.canonical_job_key(job.get('link') or job.get('url'))
+        if journal.is_done('detail', key):
+            writer.add(journal.get('detail', key))
+        else:
+            to_scrape.append(job)
+
+    if len(to_scrape) < len(jobs):
+        logging.info(f"Run journal: {len(jobs) - len(to_scrape)} detail pages already scraped.")
+
+    if to_scrape:
+        listing_hashes = {dedup.canonical_job_key(job.get('link') or job.get('url')): job.get('_listing_hash') for job in to_scrape}
+        for record in scrape(to_scrape):
+            key = dedup.canonical_job_key(record.get('url'))
+            record['_listing_hash'] = listing_hashes.get(key)
+            journal.record('detail', key, record)
+            writer.add(record)
+
+def run_stages(pool, index, writer, journals, sources=SOURCES, backfill=False):
+    """Scrapes `sources` in order, streaming every detail record into `writer`."""
+    for source in sources:
+        SOURCE_STAGES[source](pool, index, writer, journals[source], backfill)
+
+def listing_watermark(index, backfill):
+    """
+    Watermark for an incremental listing crawl: a card is known when the job
+    is stored, or a previous completed crawl already listed it. None for backfill.
+    """
+    if backfill:
+        return None
+
+    def is_known(urls):
+        listed = index.listed(dedup.canonical_job_key(url) for url in urls)
+        unlisted = [url for url in urls if dedup.canonical_job_key(url) not in listed]
+        return listed | (get_existing_keys(index, unlisted) if unlisted else set())
+    return dedup.ListingWatermark(is_known)
+
+def run_shomvob(pool, index, writer, journal, backfill=False):
+    """Shomvob: listing pages -> IT filter -> dedup -> detail pages."""
     # ==========================
     # STAGE 1: SHOMVOB
     # ==========================
     logging.info("--- Phase 1: Shomvob ---")
     
     
-    all_shomvob_candidates = somvob_link_scrapper.scrape_shomvob_pagination(max_pages=6) 
+    if journal.is_done('shomvob_listing', 'links'):
+        all_shomvob_candidates = journal.get('shomvob_listing', 'links')
+        logging.info(f"Shomvob listing restored from the run journal ({len(all_shomvob_candidates)} links).")
+    else:
+        with METRICS.stage("shomvob_listing"):
+            all_shomvob_candidates = somvob_link_scrapper.scrape_shomvob_pagination(
+                max_pages=SHOMVOB_BACKFILL_PAGES if backfill else SHOMVOB_MAX_PAGES,
+                pool=pool, journal=journal, watermark=listing_watermark(index, backfill),
+            )
+        journal.record('shomvob_listing', 'links', all_shomvob_candidates)
     
     shomvob_links_to_process = []
     if not all_shomvob_candidates:
         logging.warning("No links found for Shomvob.")
     else:
         
-        it_candidates = somvob_filtering.filter_it_jobs_memory(all_shomvob_candidates) 
-        
+        with METRICS.stage("shomvob_filter"):
+            it_candidates = somvob_filtering.filter_it_jobs_memory(all_shomvob_candidates) 
+        with METRICS.stage("shomvob_dedup"):
+            existing_keys = get_existing_keys(index, [job.get('link') or job.get('url') for job in it_candidates])
 
-        for job in it_candidates:
-            current_link = job.get('link') or job.get('url')
-            if current_link and current_link not in existing_urls:
-                shomvob_links_to_process.append(job)
+        shomvob_links_to_process = dedup.plan_detail_fetches(index, it_candidates, existing_keys)
 
-        logging.info(f"Shomvob: Found {len(it_candidates)} IT jobs. {len(shomvob_links_to_process)} are NEW.")
+        logging.info(f"Shomvob: Found {len(it_candidates)} IT jobs. {len(shomvob_links_to_process)} are new or need a refresh.")
 
 
-    shomvob_final_data = []
     if shomvob_links_to_process:
-        shomvob_final_data = somvob_job_scrapper.scrape_details_memory(shomvob_links_to_process)
+        with METRICS.stage("shomvob_details"):
+            stream_details(shomvob_links_to_process, lambda jobs: somvob_job_scrapper.iter_details(jobs, pool=pool), journal, writer)
 
+    # Only now: a crash before this point must not make the next crawl stop at these pages.
+    index.mark_listed(dedup.canonical_job_key(job.get('link') or job.get('url')) for job in all_shomvob_candidates or [])
+
+def run_bdjobs(pool, index, writer, journal, backfill=False):
+    """BDJobs (IT category listing): listing pages -> dedup -> detail pages."""
     # ==========================
     # STAGE 2: BDJOBS
     # ==========================
     logging.info("--- Phase 2: BDJobs ---")
 
-    all_bdjobs_links = bd_jobs_link_scrapper.scrape_bdjobs() 
+    if journal.is_done('bdjobs_listing', 'links'):
+        all_bdjobs_links = journal.get('bdjobs_listing', 'links')
+        logging.info(f"BDJobs listing restored from the run journal ({len(all_bdjobs_links)} links).")
+    else:
+        with METRICS.stage("bdjobs_listing"):
+            all_bdjobs_links = bd_jobs_link_scrapper.scrape_bdjobs(
+                journal=journal,
+                watermark=listing_watermark(index, backfill),
+                max_pages=bd_jobs_link_scrapper.BACKFILL_MAX_PAGES if backfill else bd_jobs_link_scrapper.MAX_PAGES,
+            )
+        journal.record('bdjobs_listing', 'links', all_bdjobs_links)
 
-    bdjobs_final_data = [] 
     all_bdjobs_candidates = []
     
     if not all_bdjobs_links:
         logging.warning("No links found for BDJobs.")
     else:
+        with METRICS.stage("bdjobs_dedup"):
+            existing_keys = get_existing_keys(index, [job.get('link') or job.get('url') for job in all_bdjobs_links])
 
-        for job in all_bdjobs_links:
-            current_link = job.get('link') or job.get('url')
-            if current_link and current_link not in existing_urls:
-                all_bdjobs_candidates.append(job)
+        all_bdjobs_candidates = dedup.plan_detail_fetches(index, all_bdjobs_links, existing_keys)
                 
-        logging.info(f"BDJobs: Found {len(all_bdjobs_links)} total. {len(all_bdjobs_candidates)} are NEW.")
+        logging.info(f"BDJobs: Found {len(all_bdjobs_links)} total. {len(all_bdjobs_candidates)} are new or need a refresh.")
 
     if all_bdjobs_candidates:
-        bdjobs_final_data = bd_jobs_job_scrapper.scrape_details_memory(all_bdjobs_candidates)
+        with METRICS.stage("bdjobs_details"):
+            stream_details(all_bdjobs_candidates, lambda jobs: bd_jobs_async_scrapper.iter_details(jobs, pool=pool), journal, writer)
 
-    # ==========================
-    # STAGE 3: MERGE, CLEAN & CATEGORIZE
-    # ==========================
-    new_jobs_batch = shomvob_final_data + bdjobs_final_data
-    
-    if new_jobs_batch:
-        final_clean_batch = []
-        
-        for job in new_jobs_batch:
-            # 1. Categorize
-            title = job.get('title', '')
-            job['category'] = combined.assign_category(title)
-            
-            if 'link' in job:
-                job['url'] = job['link']
-                del job['link']
-            
-            if job.get('url'):
-                final_clean_batch.append(job)
-
-        save_to_database(final_clean_batch)
-    else:
-        logging.info("No new jobs found today.")
+    index.mark_listed(dedup.canonical_job_key(job.get('link') or job.get('url')) for job in all_bdjobs_links or [])
 
-    logging.info("Daily Pipeline Completed.")
+SOURCE_STAGES = {
+    "shomvob": run_shomvob,
+    "bdjobs": run_bdjobs,
+}
 
-def get_seconds_until_next_run():
-    """Calculates random time for tomorrow between START_HOUR and END_HOUR."""
-    now = datetime.now()
-    tomorrow = now + timedelta(days=1)
-    
-    random_hour = random.randint(START_HOUR, END_HOUR)
-    random_minute = random.randint(0, 59)
-    
-    next_run = tomorrow.replace(hour=random_hour, minute=random_minute, second=0, microsecond=0)
-    
-    seconds_wait = (next_run - now).total_seconds()
-    
-    logging.info(f"--- Sleeping... Next run scheduled for: {next_run} ---")
-    logging.info(f"--- Time to wait: {seconds_wait/3600:.2f} hours ---")
-    
-    return seconds_wait
+def handle_sigterm(signum, frame):
+    raise SystemExit(0)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="IT job scraper microservice")
+    parser.add_argument("--backfill", action="store_true",
+                        help="crawl the listings to full depth once (no incremental watermark), then exit")
+    parser.add_argument("--source", action="append", choices=SOURCES,
+                        help="with --backfill or --replay: only this source (repeatable)")
+    parser.add_argument("--replay", nargs="?", const=page_archive.ARCHIVE_FILE, metavar="ARCHIVE",
+                        help=f"run once with every fetch served from the page archive (default {page_archive.ARCHIVE_FILE}), "
+                             f"writing to {REPLAY_OUTPUT} instead of MongoDB, then exit")
+    parser.add_argument("--replay-before", type=datetime.fromisoformat, metavar="DATETIME",
+                        help="with --replay: use the newest copy of each page fetched before this time (e.g. 2026-10-01T06:00)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    logging.info("Microservice Started.")
+    args = parse_args()
+    signal.signal(signal.SIGTERM, handle_sigterm)
 
-    logging.info("Executing immediate initial run...")
-    try:
-        run_pipeline()
-    except Exception as e:
-        logging.error(f"Critical Error in Initial Run: {e}")
+    if args.replay:
+        page_archive.configure("replay", args.replay, args.replay_before.timestamp() if args.replay_before else None)
+        run_pipeline(args.source or SOURCES, backfill=args.backfill)
+        raise SystemExit(0)
 
-    while True:
-        wait_time = get_seconds_until_next_run()
-        time.sleep(wait_time)
-        
+    if args.backfill:
         try:
-            run_pipeline()
-        except Exception as e:
-            logging.error(f"Critical Error in Pipeline: {e}")
\ No newline at end of file
+            run_pipeline(args.source or SOURCES, backfill=True)
+        finally:
+            MONGO.close()
+        raise SystemExit(0)
+
+    logging.info("Microservice Started.")
+    metrics.serve()
+
+    service = scheduler.Scheduler(
+        run_pipeline,
+        [scheduler.ScheduledSource(name, cron, jitter) for name, (cron, jitter) in SCHEDULES.items()],
+    )
+    service.install_signal_trigger()
+    service.serve_trigger()
+
+    try:
+        if RUN_ON_START:
+            logging.info("Executing immediate initial run...")
+            service.trigger()
+        service.run_forever()
+    finally:
+        MONGO.close()
+        logging.info("Microservice Stopped.")
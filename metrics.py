@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+METRICS_FILE = "run_metrics.json"                 # Per-run JSON summary, rewritten after every run
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # >0 serves Prometheus text on http://:PORT/metrics
+METRIC_PREFIX = "scraper_"
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """
+    Thread-safe in-process registry of counters and timers.
+
+    Counters: pages fetched, bytes, retries, driver restarts, jobs saved...
+    Timers: stage durations, network wait vs. parse time. A timer keeps
+    count / total / max seconds per label set, which is enough to see
+    where a run's time goes and how fast the sites answer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Starts a new run: drops everything recorded so far."""
+        with self._lock:
+            self.started_at = time.time()
+            self._counters = {}
+            self._timers = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            count, total, longest = self._timers.get(key, (0, 0.0, 0.0))
+            self._timers[key] = (count + 1, total + seconds, max(longest, seconds))
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stage(self, stage):
+        """Times one pipeline stage (`stage_seconds{stage=...}`)."""
+        return self.timer("stage_seconds", stage=stage)
+
+    def merge(self, summary):
+        """Adds a summary() taken in another process (a source worker) to this registry."""
+        with self._lock:
+            for c in summary.get('counters', []):
+                key = (c['name'], _label_key(c['labels']))
+                self._counters[key] = self._counters.get(key, 0) + c['value']
+            for t in summary.get('timers', []):
+                key = (t['name'], _label_key(t['labels']))
+                count, total, longest = self._timers.get(key, (0, 0.0, 0.0))
+                self._timers[key] = (count + t['count'], total + t['total_seconds'], max(longest, t['max_seconds']))
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def summary(self):
+        """Everything recorded since reset() as a JSON-friendly dict."""
+        with self._lock:
+            counters = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in self._counters.items()]
+            timers = [
+                {'name': n, 'labels': dict(l), 'count': c, 'total_seconds': round(t, 3),
+                 'avg_seconds': round(t / c, 3) if c else 0.0, 'max_seconds': round(m, 3)}
+                for (n, l), (c, t, m) in self._timers.items()
+            ]
+            started_at = self.started_at
+
+        duration = time.time() - started_at
+        saved = sum(c['value'] for c in counters if c['name'] == 'jobs_saved')
+        return {
+            'started_at': started_at,
+            'duration_seconds': round(duration, 3),
+            'jobs_per_second': round(saved / duration, 4) if duration > 0 else 0.0,
+            'counters': counters,
+            'timers': timers,
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (counters as *_total, timers as summaries)."""
+        def fmt(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted(self._timers.items())
+
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{fmt(labels)} {value}")
+
+        for (name, labels), (count, total, _) in timers:
+            metric = f"{METRIC_PREFIX}{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} summary")
+                seen.add(metric)
+            lines.append(f"{metric}_count{fmt(labels)} {count}")
+            lines.append(f"{metric}_sum{fmt(labels)} {total:.6f}")
+
+        for (name, labels), (_, _, longest) in timers:
+            metric = f"{METRIC_PREFIX}{name}_max"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} gauge")
+                seen.add(metric)
+            lines.append(f"{metric}{fmt(labels)} {longest:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path=METRICS_FILE):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, indent=2)
+            logging.info(f"Run metrics written to {path}.")
+        except Exception as e:
+            logging.error(f"Could not write run metrics: {e}")
+
+    def log_stages(self):
+        """One log line per timed stage, slowest first."""
+        stages = [t for t in self.summary()['timers'] if t['name'] == 'stage_seconds']
+        for t in sorted(stages, key=lambda t: t['total_seconds'], reverse=True):
+            logging.info(f"Stage {t['labels'].get('stage')}: {t['total_seconds']:.1f}s")
+
+
+METRICS = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = METRICS.to_prometheus().encode('utf-8'), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = json.dumps(METRICS.summary()).encode('utf-8'), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=METRICS_PORT):
+    """Serves /metrics (Prometheus) and /metrics.json from a daemon thread. No-op when port is 0."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"Metrics endpoint listening on :{port}/metrics")
+    return server
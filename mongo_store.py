@@ -0,0 +1,213 @@
+import os
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+import combined
+import dedup
+from metrics import METRICS
+
+# --- CONFIGURATION ---
+WRITE_BATCH_SIZE = 10       # Jobs per MongoDB bulk_write
+WRITE_FLUSH_SECONDS = 120   # Flush a partial batch after this long
+FIRST_SEEN_FIELDS = ("published",)  # Kept from the first save when a job is refreshed (Shomvob stamps the scrape date)
+
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+if not MONGO_URI:
+    print("Error: MONGO_URI not found in .env file!")
+else:
+    print("Successfully loaded Mongo URI.")
+DB_NAME = "test"
+COLLECTION_NAME = "jobs"
+MONGO_MAX_POOL_SIZE = 10          # Connections kept per server
+MONGO_TIMEOUT_MS = 10000          # Server selection / connect timeout
+MONGO_SOCKET_TIMEOUT_MS = 60000   # Per-operation socket timeout
+
+
+class MongoConnection:
+    """
+    One MongoClient for the whole service lifetime. The client is created
+    lazily, health-checked before each run (and rebuilt if the ping fails)
+    and closed on shutdown, instead of a new client (SRV lookup, TLS
+    handshake, monitor threads) every time the collection is needed.
+    """
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.client = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            if self.client is None:
+                self.client = MongoClient(
+                    self.uri,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    retryWrites=True,
+                    retryReads=True,
+                )
+            return self.client
+
+    def collection(self):
+        return self.connect()[DB_NAME][COLLECTION_NAME]
+
+    def health_check(self):
+        """Pings the server; on failure drops the client and tries once with a fresh one."""
+        for attempt in (1, 2):
+            try:
+                self.connect().admin.command("ping")
+                return True
+            except Exception as e:
+                logging.warning(f"MongoDB health check failed (attempt {attempt}): {e}")
+                self.close()
+        return False
+
+    def close(self):
+        with self._lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+MONGO = MongoConnection(MONGO_URI)
+
+def get_mongo_collection():
+    """Returns the jobs collection from the shared client."""
+    return MONGO.collection()
+
+def prepare_job(job, category):
+    """Final clean-up before saving: category, `link` -> `url`, canonical key."""
+    job['category'] = category
+
+    if 'link' in job:
+        job['url'] = job['link']
+        del job['link']
+
+    if job.get('url'):
+        job['job_key'] = dedup.canonical_job_key(job['url'])
+        job['url'] = dedup.canonical_url(job['url'])
+    return job
+
+def build_update(job, fields, previous_fields):
+    """
+    Upsert for one prepared job. A job without stored field hashes gets a
+    `$set` of every field; otherwise only changed fields are `$set` (the
+    rest is `$setOnInsert`, in case the document was removed meanwhile).
+    FIRST_SEEN_FIELDS are always `$setOnInsert`, so they keep the value of
+    the first save. None = unchanged.
+    """
+    if previous_fields is None:
+        changed = {f: v for f, v in job.items() if f not in FIRST_SEEN_FIELDS}
+    else:
+        changed = {f: v for f, v in job.items() if f not in FIRST_SEEN_FIELDS and previous_fields.get(f) != fields[f]}
+        if not changed:
+            return None
+    update = {'$set': changed}
+    rest = {f: v for f, v in job.items() if f not in changed}
+    if rest:
+        update['$setOnInsert'] = rest
+    return UpdateOne({'job_key': job['job_key']}, update, upsert=True)
+
+class JobWriter:
+    """
+    Pipeline sink: categorizes scraped jobs and upserts them into MongoDB
+    in micro-batches, flushed every `batch_size` jobs or `flush_seconds`
+    seconds, so a crash only loses the current batch.
+
+    Jobs that are already stored only get a `$set` of the fields whose
+    hash changed since the last save (nothing at all if none did); the
+    fingerprint store in the dedup index is updated after each write.
+    With a `sink` (replay runs) the prepared jobs go there instead of MongoDB.
+    Saved jobs are recorded in `journals[source]`, the run journal of their source.
+    """
+
+    def __init__(self, index, journals=None, batch_size=WRITE_BATCH_SIZE, flush_seconds=WRITE_FLUSH_SECONDS, sink=None):
+        self.index = index
+        self.journals = journals or {}
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.saved = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def add(self, job):
+        self._buffer.append(job)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        batch, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not batch:
+            return
+
+        categories = combined.assign_categories([job.get('title', '') for job in batch])
+        jobs = [job for job in (prepare_job(job, category) for job, category in zip(batch, categories)) if job.get('url')]
+        if self.sink is not None:
+            for job in jobs:
+                job.pop('_listing_hash', None)
+                self.sink.add(job)
+            self._saved(jobs, len(jobs))
+            return
+
+        previous = self.index.fingerprints(job['job_key'] for job in jobs)
+
+        now = time.time()
+        operations, operation_jobs, fingerprints = [], [], []
+        for position, job in enumerate(jobs):
+            listing_hash = job.pop('_listing_hash', None)
+            fields = dedup.field_hashes(job)
+            fingerprints.append((job['job_key'], listing_hash, fields, now))
+            operation = build_update(job, fields, (previous.get(job['job_key']) or {}).get('fields'))
+            if operation is not None:
+                operations.append(operation)
+                operation_jobs.append(position)
+
+        if not operations:
+            self.index.set_fingerprints(fingerprints)
+            if jobs:
+                logging.info(f"Batch of {len(jobs)} refreshed jobs had no changes; nothing written.")
+            return
+
+        try:
+            collection = get_mongo_collection()
+            with METRICS.timer("mongo_write_seconds"):
+                result = collection.bulk_write(operations, ordered=False)
+            written = result.upserted_count + result.modified_count
+            logging.info(f"Saved batch of {len(operations)} jobs to MongoDB ({result.upserted_count} new).")
+        except BulkWriteError as e:
+            written = e.details.get('nUpserted', 0) + e.details.get('nModified', 0)
+            errors = e.details.get('writeErrors', [])
+            logging.warning(f"Saved {written} of {len(operations)} jobs; {len(errors)} failed and stay unsaved "
+                            f"(first error: {errors[0].get('errmsg') if errors else 'unknown'}).")
+            # Failed jobs get no fingerprint, index entry or journal record, so a later run retries them.
+            failed = {operation_jobs[error['index']] for error in errors}
+            jobs = [job for position, job in enumerate(jobs) if position not in failed]
+            fingerprints = [fp for position, fp in enumerate(fingerprints) if position not in failed]
+        except Exception as e:
+            logging.error(f"Failed to save to MongoDB: {e}")
+            return
+
+        self.index.set_fingerprints(fingerprints)
+        self._saved(jobs, written)
+
+    def _saved(self, jobs, written):
+        self.saved += written
+        METRICS.inc("jobs_saved", written)
+        self.index.add(job['job_key'] for job in jobs)
+        for job in jobs:
+            # Job keys start with their source: 'bdjobs:...', 'shomvob:...'.
+            journal = self.journals.get(job['job_key'].split(':', 1)[0])
+            if journal is not None:
+                journal.record('persisted', job['job_key'])
+
+    def close(self):
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
@@ -0,0 +1,153 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+import dedup
+from metrics import METRICS
+
+# --- CONFIGURATION ---
+# PAGE_ARCHIVE: "record" (default) stores every fetched page, "replay" serves
+# every fetch from the archive instead of the network, "off" does neither.
+# Set through the environment so spawned source workers inherit it.
+ARCHIVE_MODE = os.getenv("PAGE_ARCHIVE", "record")
+ARCHIVE_FILE = os.getenv("PAGE_ARCHIVE_FILE", "page_archive.sqlite3")
+REPLAY_BEFORE = float(os.getenv("PAGE_ARCHIVE_BEFORE", "0")) or None  # Replay the newest copy fetched before this epoch time
+RETENTION_DAYS = 30       # Recorded pages older than this are pruned at the start of a run
+COMPRESSION_LEVEL = 6     # zlib level for stored bodies
+
+# Stored kinds: "http" (raw response body), "rendered" (page HTML after
+# Selenium rendered it) and "cards" (JSON card list of a Shomvob listing page).
+
+
+class ReplayMiss(LookupError):
+    """Replay mode asked for a page the archive has no copy of."""
+
+
+class PageArchive:
+    """
+    SQLite archive of fetched pages: one zlib-compressed row per fetch,
+    keyed by canonical URL (dedup.canonical_url), kind and fetch time.
+    Safe to share between threads; WAL lets worker processes write at once.
+    """
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url_key TEXT, kind TEXT, fetched_at REAL, url TEXT, status INTEGER, body BLOB, "
+            "PRIMARY KEY (url_key, kind, fetched_at))"
+        )
+        self._conn.commit()
+
+    def record(self, url, content, kind="http", status=200):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        body = zlib.compress(content, COMPRESSION_LEVEL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url_key, kind, fetched_at, url, status, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (dedup.canonical_url(url), kind, time.time(), url, status, body),
+            )
+            self._conn.commit()
+        METRICS.inc("pages_archived", kind=kind)
+        METRICS.inc("archive_bytes", len(body), kind=kind)
+
+    def latest(self, url, kind="http", before=None):
+        """Body (bytes) of the newest copy of `url` fetched before `before` (epoch seconds), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM pages WHERE url_key = ? AND kind = ? AND fetched_at < ? ORDER BY fetched_at DESC LIMIT 1",
+                (dedup.canonical_url(url), kind, before or float("inf")),
+            ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def prune(self, days=RETENTION_DAYS):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - days * 86400,)).rowcount
+            self._conn.commit()
+        if deleted:
+            logging.info(f"Page archive: pruned {deleted} pages older than {days} days.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def configure(mode, path=None, before=None):
+    """Switches this process (and workers it spawns later) to `mode`: off, record or replay."""
+    global ARCHIVE_MODE, ARCHIVE_FILE, REPLAY_BEFORE, _archive
+    if mode not in ("off", "record", "replay"):
+        raise ValueError(f"Unknown page archive mode '{mode}'")
+    with _archive_lock:
+        ARCHIVE_MODE = os.environ["PAGE_ARCHIVE"] = mode
+        if path:
+            ARCHIVE_FILE = os.environ["PAGE_ARCHIVE_FILE"] = path
+        if before:
+            REPLAY_BEFORE = before
+            os.environ["PAGE_ARCHIVE_BEFORE"] = str(before)
+        if _archive is not None:
+            _archive.close()
+            _archive = None
+
+def get_archive():
+    """The process-wide archive, opened on first use."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PageArchive(ARCHIVE_FILE)
+        return _archive
+
+def replaying():
+    return ARCHIVE_MODE == "replay"
+
+def record(url, content, kind="http", status=200):
+    """Stores a fetched page when recording. Never fails the crawl."""
+    if ARCHIVE_MODE != "record" or not url or content is None:
+        return
+    try:
+        get_archive().record(url, content, kind, status)
+    except Exception as e:
+        logging.warning(f"Page archive: could not store {url}: {e}")
+
+def replay(url, kind="http"):
+    """Archived body (bytes) of `url`; raises ReplayMiss when there is none."""
+    body = get_archive().latest(url, kind, REPLAY_BEFORE)
+    if body is None:
+        METRICS.inc("replay_misses", kind=kind)
+        raise ReplayMiss(f"No archived {kind} copy of {url}")
+    METRICS.inc("pages_replayed", kind=kind)
+    return body
+
+def prune():
+    if ARCHIVE_MODE == "record":
+        try:
+            get_archive().prune()
+        except Exception as e:
+            logging.warning(f"Page archive: prune failed: {e}")
+
+
+class ArchiveFetcher:
+    """Fetcher for Shomvob.somvob_job_scrapper.extract that serves pages from the archive."""
+
+    name = "replay"
+
+    def __init__(self, kind="rendered"):
+        self.kind = kind
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def fetch(self, url):
+        return replay(url, self.kind).decode('utf-8', errors='replace')
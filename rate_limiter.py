@@ -0,0 +1,109 @@
+import time
+import random
+import logging
+import threading
+
+# --- CONFIGURATION ---
+# Per-host politeness policy. `min_interval` is the fastest the limiter may
+# ever go, `start_interval` where it begins, `max_interval` how far it may
+# back off; `jitter` is extra random delay per request (stealth).
+DEFAULT_POLICY = {
+    'min_interval': 1.0,
+    'start_interval': None,   # None = min_interval
+    'max_interval': 60.0,
+    'jitter': 0.0,
+    'burst': 1,               # Requests that may go out back-to-back after an idle period
+    'latency_target': None,   # Seconds; slower answers count as a slowdown signal
+}
+HOST_POLICIES = {
+    'jobs.bdjobs.com': {'min_interval': 2.0, 'start_interval': 4.0, 'max_interval': 60.0, 'jitter': 2.0, 'latency_target': 10.0},
+    'app.shomvob.co': {'min_interval': 2.0, 'start_interval': 3.0, 'max_interval': 60.0, 'jitter': 1.0, 'latency_target': 15.0},  # <= 30 requests/min
+}
+SPEEDUP_STEP = 0.25           # Seconds taken off the interval per healthy response (additive increase)
+BACKOFF_FACTOR = 2.0          # Interval multiplier on 429/5xx/timeouts (multiplicative decrease)
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """
+    Thread-safe adaptive (AIMD) token-bucket limiter for one host.
+
+    Tokens refill at one per `interval` seconds, up to `burst`; callers that
+    find the bucket empty are handed a future slot, so several workers can
+    share one budget. Callers report how each request went with
+    `feedback()`: healthy, fast answers shrink the interval by SPEEDUP_STEP
+    down to `min_interval`; 429/5xx, timeouts and latency spikes multiply
+    it by BACKOFF_FACTOR up to `max_interval`. Random jitter is added on
+    top of every delay.
+    """
+
+    def __init__(self, min_interval, jitter=0.0, max_interval=None, start_interval=None, burst=1, latency_target=None, name=""):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval or min_interval, min_interval)
+        self.interval = min(max(start_interval or min_interval, min_interval), self.max_interval)
+        self.jitter = jitter
+        self.burst = burst
+        self.latency_target = latency_target
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.interval > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+        else:
+            self._tokens = self.burst
+        self._updated = now
+
+    def reserve(self):
+        """Claims the next free slot and returns the seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # A negative balance is a queue of reservations: wait until our token has refilled.
+            delay = -self._tokens * self.interval if self._tokens < 0 else 0.0
+        return delay + random.uniform(0, self.jitter)
+
+    def wait(self):
+        """Blocks until the caller may send its next request."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def feedback(self, status=None, latency=None, error=False):
+        """
+        Adjusts the pace after a request. `error=True` (timeout, connection
+        reset, blocked page) and THROTTLE_STATUSES back off; anything else
+        speeds up, unless `latency` exceeds the host's latency target.
+        """
+        slow = self.latency_target is not None and latency is not None and latency > self.latency_target
+        throttled = error or status in THROTTLE_STATUSES or slow
+        with self._lock:
+            if throttled:
+                # max(..., 0.1) so a limiter that sped up to 0s can still back off.
+                self.interval = min(self.max_interval, max(self.interval, 0.1) * BACKOFF_FACTOR)
+            else:
+                self.interval = max(self.min_interval, self.interval - SPEEDUP_STEP)
+            interval = self.interval
+
+        if throttled:
+            reason = "error" if error else (f"HTTP {status}" if status in THROTTLE_STATUSES else f"slow answer ({latency:.1f}s)")
+            logging.warning(f"Rate limiter {self.name}: backing off to {interval:.1f}s per request after {reason}.")
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(host, **overrides):
+    """
+    Returns the process-wide limiter for `host`, creating it on first use
+    from DEFAULT_POLICY, the host's HOST_POLICIES entry and `overrides`.
+    """
+    with _LIMITERS_LOCK:
+        if host not in _LIMITERS:
+            policy = {**DEFAULT_POLICY, **HOST_POLICIES.get(host, {}), **overrides}
+            _LIMITERS[host] = RateLimiter(name=host, **policy)
+        return _LIMITERS[host]
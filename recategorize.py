@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import combined
+
+# --- CONFIGURATION ---
+STATE_FILE = "recategorize_state.json"  # _id watermark of the last written batch, for resuming
+BATCH_SIZE = 5000                       # Documents per cursor batch and per bulk_write
+CHUNK_SIZE = 2000                       # Distinct titles per process-pool task
+WORKERS = os.cpu_count() or 1           # Matcher processes; 1 = match in this process
+LOG_EVERY = 10                          # Batches between progress lines
+
+
+def mapping_fingerprint():
+    """Changes whenever CATEGORY_MAPPING or the threshold does; a saved watermark is only valid for the same one."""
+    config = {
+        'mapping': combined.CATEGORY_MAPPING,
+        'threshold': combined.CATEGORY_THRESHOLD,
+        'uncategorized': combined.UNCATEGORIZED,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_state(fingerprint, path=STATE_FILE):
+    """The saved watermark, or None when there is none or it belongs to another mapping."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json_util.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if state.get('fingerprint') != fingerprint:
+        logging.info("Category mapping changed since the saved watermark; starting from the beginning.")
+        return None
+    return state
+
+def save_state(state, path=STATE_FILE):
+    # Write-then-rename, so a crash never leaves a half-written watermark.
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(json_util.dumps(state))
+    os.replace(path + ".tmp", path)
+
+def _init_worker():
+    # One cdist thread per process; the pool provides the parallelism.
+    combined.MATCH_WORKERS = 1
+
+def _title(doc):
+    return str(doc.get('title') or doc.get('job_title') or '')
+
+
+class BatchMatcher:
+    """
+    Categorizes batches of titles. Titles repeat heavily across a
+    collection, so every distinct title is matched once per run; new ones
+    are split into CHUNK_SIZE chunks and matched across a process pool.
+    """
+
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self.known = {}
+        self.executor = None
+        if workers > 1:
+            self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker)
+
+    def categorize(self, titles):
+        missing = [t for t in dict.fromkeys(titles) if t not in self.known]
+        if missing:
+            chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+            if self.executor is None or len(chunks) == 1:
+                results = map(combined.assign_categories, chunks)
+            else:
+                results = self.executor.map(combined.assign_categories, chunks)
+            for chunk, categories in zip(chunks, results):
+                self.known.update(zip(chunk, categories))
+        return [self.known[t] for t in titles]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def iter_batches(collection, after=None, batch_size=BATCH_SIZE):
+    """Streams the collection in `_id` order, after the watermark `after`, as lists of documents."""
+    query = {'_id': {'$gt': after}} if after is not None else {}
+    cursor = collection.find(query, {'title': 1, 'job_title': 1, 'category': 1}).sort('_id', 1).batch_size(batch_size)
+    batch = []
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+def recategorize(collection, workers=WORKERS, batch_size=BATCH_SIZE, dry_run=False, restart=False, state_file=STATE_FILE):
+    """
+    Recomputes `category` for every job in `collection` and writes back only
+    the ones that changed, one unordered bulk_write per batch. Progress is
+    saved as an `_id` watermark after each batch, so an interrupted run
+    resumes where it stopped (as long as the mapping is unchanged).
+    Returns (scanned, changed).
+    """
+    fingerprint = mapping_fingerprint()
+    state = None if restart else load_state(fingerprint, state_file)
+    if state is None:
+        state = {'fingerprint': fingerprint, 'last_id': None, 'scanned': 0, 'changed': 0}
+    else:
+        logging.info(f"Resuming after _id {state['last_id']} ({state['scanned']} scanned, {state['changed']} changed so far).")
+
+    matcher = BatchMatcher(workers)
+    start = time.monotonic()
+    scanned = changed = 0
+    try:
+        for n, batch in enumerate(iter_batches(collection, state['last_id'], batch_size), 1):
+            categories = matcher.categorize([_title(doc) for doc in batch])
+            operations = [
+                UpdateOne({'_id': doc['_id']}, {'$set': {'category': category}})
+                for doc, category in zip(batch, categories)
+                if doc.get('category') != category
+            ]
+
+            if operations and not dry_run:
+                try:
+                    collection.bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    # Not saving the watermark: a rerun retries this batch.
+                    logging.error(f"Batch after _id {state['last_id']}: {len(e.details.get('writeErrors', []))} updates failed.")
+                    raise
+
+            scanned += len(batch)
+            changed += len(operations)
+            if not dry_run:
+                state.update(last_id=batch[-1]['_id'], scanned=state['scanned'] + len(batch), changed=state['changed'] + len(operations))
+                save_state(state, state_file)
+
+            if n % LOG_EVERY == 0:
+                elapsed = time.monotonic() - start
+                logging.info(f"Recategorize: {scanned} scanned, {changed} changed ({scanned / elapsed:.0f} docs/s).")
+    finally:
+        matcher.close()
+
+    elapsed = time.monotonic() - start
+    logging.info(
+        f"Recategorize {'dry run ' if dry_run else ''}done: {scanned} scanned, {changed} "
+        f"{'would change' if dry_run else 'changed'}, {len(matcher.known)} distinct titles, {elapsed:.1f}s."
+    )
+    if not dry_run and os.path.exists(state_file):
+        # A finished pass leaves nothing to resume.
+        os.remove(state_file)
+    return scanned, changed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute the category of every job in MongoDB after CATEGORY_MAPPING changed")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="matcher processes (1 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count the changes without writing")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved watermark and start from the first document")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    from mongo_store import MONGO, get_mongo_collection
+
+    try:
+        recategorize(get_mongo_collection(), args.workers, args.batch_size, args.dry_run, args.restart)
+    finally:
+        MONGO.close()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import logging
+import threading
+
+# --- CONFIGURATION ---
+JOURNAL_FILE = "run_journal.{source}.jsonl"   # Append-only progress log of a source's current run
+MAX_RESUME_AGE = 12 * 3600                    # An unfinished run older than this is started over
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of one source's pipeline run. Every finished
+    unit of work (a listing page, the link list, a scraped detail page, a
+    saved job) is written as one line as soon as it is done:
+
+        {"run": "<run id>", "ts": ..., "stage": "bdjobs_page", "unit": "3", "data": [...]}
+
+    If the process dies, `RunJournal.open()` finds the unfinished run and
+    the stages skip every unit that is already in the journal. There is
+    one journal per source, so any later run that includes the source
+    resumes it, whatever other sources that run covers.
+    """
+
+    def __init__(self, path, run_id, events=()):
+        self.path = path
+        self.run_id = run_id
+        self._units = {}
+        self._lock = threading.Lock()
+        for event in events:
+            self._units.setdefault(event['stage'], {})[event['unit']] = event.get('data')
+
+    @classmethod
+    def open(cls, path):
+        """Resumes the last run if it never completed, otherwise starts a new journal."""
+        events = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # A line cut off by the crash itself.
+                        break
+        except FileNotFoundError:
+            pass
+
+        if events:
+            run_id = events[-1]['run']
+            run_events = [e for e in events if e['run'] == run_id]
+            finished = any(e['stage'] == 'run' and e['unit'] == 'completed' for e in run_events)
+            too_old = time.time() - run_events[0]['ts'] > MAX_RESUME_AGE
+            if not finished and not too_old:
+                logging.info(f"Resuming unfinished run {run_id} ({len(run_events)} journal entries).")
+                return cls(path, run_id, run_events)
+
+        # Start over: the previous run is complete (or stale), so its entries are no longer needed.
+        open(path, 'w', encoding='utf-8').close()
+        journal = cls(path, time.strftime("%Y%m%d-%H%M%S"))
+        journal.record('run', 'started')
+        return journal
+
+    def record(self, stage, unit, data=None):
+        event = {'run': self.run_id, 'ts': time.time(), 'stage': stage, 'unit': str(unit), 'data': data}
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._units.setdefault(stage, {})[str(unit)] = data
+
+    def is_done(self, stage, unit):
+        with self._lock:
+            return str(unit) in self._units.get(stage, {})
+
+    def get(self, stage, unit, default=None):
+        with self._lock:
+            return self._units.get(stage, {}).get(str(unit), default)
+
+    def units(self, stage):
+        """All recorded units of `stage` as {unit: data}."""
+        with self._lock:
+            return dict(self._units.get(stage, {}))
+
+    def snapshot(self):
+        """All recorded units as {stage: {unit: data}}, e.g. to hand to a worker process."""
+        with self._lock:
+            return {stage: dict(units) for stage, units in self._units.items()}
+
+    def complete(self):
+        self.record('run', 'completed')
+
+
+def journal_file(source):
+    return JOURNAL_FILE.format(source=source)
+
+
+class ForwardingJournal:
+    """
+    RunJournal stand-in for a worker process: answers is_done/get/units
+    from a snapshot of the parent's journal and passes every record() to
+    `send(stage, unit, data)`, so the parent stays the only writer of the
+    journal file.
+    """
+
+    def __init__(self, units, send):
+        self._units = units
+        self._send = send
+
+    def record(self, stage, unit, data=None):
+        self._units.setdefault(stage, {})[str(unit)] = data
+        self._send(stage, str(unit), data)
+
+    def is_done(self, stage, unit):
+        return str(unit) in self._units.get(stage, {})
+
+    def get(self, stage, unit, default=None):
+        return self._units.get(stage, {}).get(str(unit), default)
+
+    def units(self, stage):
+        return dict(self._units.get(stage, {}))
@@ -0,0 +1,224 @@
+import os
+import random
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+TRIGGER_PORT = int(os.getenv("TRIGGER_PORT", "0"))  # >0 accepts POST /run[?source=...] on this port
+MAX_LOOKAHEAD_DAYS = 4 * 366                        # Long enough to reach the next Feb 29
+RETRY_DELAY_MINUTES = 30                            # A failed source runs again this soon (resuming its journal)...
+MAX_RETRIES = 2                                     # ...at most this many times in a row before waiting for its schedule
+
+_CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]  # minute hour day-of-month month day-of-week (0 = Sunday)
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Standard 5-field cron expression ("minute hour day month weekday"),
+    supporting '*', lists, ranges and '/step'. Weekday 0 is Sunday.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _CRON_RANGES)
+        )
+        # Like cron: if both day fields are restricted, either one may match.
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after):
+        """First matching minute strictly after `after` (naive local datetime)."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after + timedelta(days=MAX_LOOKAHEAD_DAYS)
+        while dt <= limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class SourcesFailed(RuntimeError):
+    """A run finished, but the sources in `failed` ({source: error}) did not."""
+
+    def __init__(self, failed):
+        super().__init__(f"Source(s) failed: {', '.join(f'{s} ({e})' for s, e in failed.items())}")
+        self.failed = failed
+
+
+class ScheduledSource:
+    """One source's cadence: a cron expression plus a random delay of up to `jitter_minutes`."""
+
+    def __init__(self, name, cron, jitter_minutes=0):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.jitter_minutes = jitter_minutes
+        self.next_run = None
+
+    def plan_next(self, now):
+        base = self.schedule.next_after(now)
+        self.next_run = base + timedelta(seconds=random.uniform(0, self.jitter_minutes * 60))
+        return self.next_run
+
+
+class Scheduler:
+    """
+    Runs `run(sources)` whenever one or more sources are due. Sources that
+    come due together (or are triggered while a run is in progress) are
+    coalesced into the next run, so runs never overlap and a source is
+    never queued twice. The loop sleeps on an Event, so `trigger()` (from
+    SIGUSR1, the HTTP endpoint or code) wakes it immediately. A source
+    whose run fails is retried after RETRY_DELAY_MINUTES, while its
+    unfinished run journal can still be resumed.
+    """
+
+    def __init__(self, run, sources):
+        self.run = run
+        self.sources = {source.name: source for source in sources}
+        self._pending = set()
+        self._retries = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def trigger(self, names=None):
+        """Requests an on-demand run of `names` (default: every source)."""
+        names = list(names or self.sources)
+        unknown = [n for n in names if n not in self.sources]
+        if unknown:
+            raise ValueError(f"Unknown source(s): {', '.join(unknown)}")
+        with self._lock:
+            self._pending.update(names)
+        logging.info(f"Run triggered for: {', '.join(names)}")
+        self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def _collect_due(self, now):
+        with self._lock:
+            for source in self.sources.values():
+                if source.next_run is not None and source.next_run <= now:
+                    self._pending.add(source.name)
+                    source.plan_next(now)
+            due, self._pending = sorted(self._pending), set()
+        return due
+
+    def _plan_retries(self, due, failed):
+        retry_at = datetime.now() + timedelta(minutes=RETRY_DELAY_MINUTES)
+        with self._lock:
+            for name in due:
+                retries = self._retries.get(name, 0)
+                if name not in failed or retries >= MAX_RETRIES:
+                    self._retries[name] = 0
+                    continue
+                self._retries[name] = retries + 1
+                source = self.sources[name]
+                source.next_run = min(source.next_run, retry_at)
+                logging.info(f"Retrying {name} ({retries + 1}/{MAX_RETRIES}) at {source.next_run}.")
+
+    def run_forever(self):
+        now = datetime.now()
+        for source in self.sources.values():
+            source.plan_next(now)
+            logging.info(f"Schedule {source.name} ('{source.schedule.expression}', +{source.jitter_minutes}m jitter): next run at {source.next_run}")
+
+        while not self._stopped:
+            due = self._collect_due(datetime.now())
+            if due:
+                failed = ()
+                try:
+                    self.run(due)
+                except SourcesFailed as e:
+                    logging.error(f"Pipeline run ({', '.join(due)}): {e}")
+                    failed = e.failed
+                except Exception as e:
+                    logging.error(f"Critical Error in Pipeline ({', '.join(due)}): {e}")
+                    failed = due
+                self._plan_retries(due, failed)
+                for name in due:
+                    logging.info(f"Next scheduled run of {name}: {self.sources[name].next_run}")
+                continue
+
+            next_run = min(source.next_run for source in self.sources.values())
+            wait = max(0.0, (next_run - datetime.now()).total_seconds())
+            logging.info(f"--- Sleeping... Next run scheduled for: {next_run} ({wait/3600:.2f} hours) ---")
+            # Re-check at least hourly so clock changes (DST, suspend) cannot stall the loop.
+            self._wake.wait(min(wait, 3600))
+            self._wake.clear()
+
+    def install_signal_trigger(self):
+        """SIGUSR1 triggers a run of every source (POSIX only)."""
+        def on_signal(signum, frame):
+            # trigger() takes locks the interrupted main thread may be holding; hand it off.
+            threading.Thread(target=self.trigger, daemon=True).start()
+
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, on_signal)
+
+    def serve_trigger(self, port=TRIGGER_PORT):
+        """Accepts `POST /run` or `POST /run?source=bdjobs&source=shomvob`. No-op when port is 0."""
+        if not port:
+            return None
+        scheduler = self
+
+        class TriggerHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                if parsed.path.rstrip("/") != "/run":
+                    self.send_error(404)
+                    return
+                try:
+                    scheduler.trigger(parse_qs(parsed.query).get("source"))
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                self.send_response(202)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), TriggerHandler)
+        threading.Thread(target=server.serve_forever, name="scheduler-trigger", daemon=True).start()
+        logging.info(f"Run trigger listening on 127.0.0.1:{port}/run")
+        return server
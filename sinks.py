@@ -0,0 +1,101 @@
+import sys
+import json
+import logging
+
+# --- CONFIGURATION ---
+SINK_KINDS = ("json", "jsonl", "stdout", "mongo")
+
+
+# A sink is anything with add(record) and close(); mongo_store.JobWriter is one too.
+
+class JsonFileSink:
+    """Collects records and writes them as one indented JSON array on close()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+
+    def close(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=4, ensure_ascii=False)
+        print(f"Done! Saved {len(self.records)} jobs to {self.path}")
+
+
+class JsonlSink:
+    """Appends one JSON object per line as records arrive, so a crash keeps everything written so far."""
+
+    def __init__(self, path=None, stream=None):
+        self.path = path
+        self._own = stream is None
+        self.stream = stream if stream is not None else open(path, 'a', encoding='utf-8')
+        self.count = 0
+
+    def add(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        if self._own:
+            self.stream.close()
+            logging.info(f"Appended {self.count} jobs to {self.path}")
+
+
+class StdoutSink(JsonlSink):
+    """JSON lines on stdout, for piping into other tools."""
+
+    def __init__(self):
+        super().__init__(stream=sys.stdout)
+
+
+class MongoSink:
+    """Categorizes and upserts records into MongoDB through the pipeline's JobWriter."""
+
+    def __init__(self):
+        import dedup
+        from mongo_store import JobWriter
+        self.index = dedup.DedupIndex()
+        self.writer = JobWriter(self.index)
+
+    def add(self, record):
+        self.writer.add(record)
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            self.index.close()
+
+
+def open_sink(kind, path=None):
+    """Builds the sink named `kind` (one of SINK_KINDS); file sinks need `path`."""
+    if kind == "json":
+        return JsonFileSink(path)
+    if kind == "jsonl":
+        return JsonlSink(path)
+    if kind == "stdout":
+        return StdoutSink()
+    if kind == "mongo":
+        return MongoSink()
+    raise ValueError(f"Unknown sink '{kind}' (expected one of: {', '.join(SINK_KINDS)})")
+
+
+def drain(records, *sinks):
+    """Feeds every record to every sink, closes the sinks and returns the record count."""
+    count = 0
+    try:
+        for record in records:
+            for sink in sinks:
+                sink.add(record)
+            count += 1
+    finally:
+        # Close even after a crash, so file sinks keep what was scraped.
+        for sink in sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logging.error(f"Failed to close {type(sink).__name__}: {e}")
+    return count